@@ -47,17 +47,6 @@ const UploadPage = () => {
         setIsProcessing(true)
         setProcessingProgress(0)
 
-        // Simulate processing with progress updates
-        const progressInterval = setInterval(() => {
-            setProcessingProgress((prev) => {
-                if (prev >= 90) {
-                    clearInterval(progressInterval)
-                    return 90
-                }
-                return prev + 10
-            })
-        }, 200)
-
         try {
             const formData = new FormData()
             formData.append("file", uploadedFile)
@@ -74,18 +63,36 @@ const UploadPage = () => {
                 throw new Error("Failed to process document")
             }
 
-            const data = await response.json()
-            console.log("Parsed API Response:", data);
+            // The upload is processed in the background; poll the job until it finishes
+            let job = await response.json()
+            console.log("Queued prescription job:", job);
+            while (job.status === "queued" || job.status === "running") {
+                setProcessingProgress(job.progress)
+                await new Promise((resolve) => setTimeout(resolve, 1000))
+                const jobResponse = await fetch(`/prescriptions/jobs/${job.job_id}`, {
+                    headers: {
+                        "Authorization": `Bearer ${localStorage.getItem("token")}`
+                    }
+                })
+                if (!jobResponse.ok) {
+                    throw new Error("Failed to check processing status")
+                }
+                job = await jobResponse.json()
+            }
+
+            if (job.status === "failed" || !job.prescription) {
+                throw new Error(job.error || "Failed to process document")
+            }
+            console.log("Finished prescription job:", job);
 
             // Set extracted medications without selection property
-            const meds = (data.extracted_data.medications || [])
+            const meds = (job.prescription.extracted_data.medications || [])
             setExtractedData(meds)
             console.log("Updated extractedData state:", meds)
             setIsProcessed(true)
         } catch (error) {
             setErrorMessage(error.message || "Error processing document")
         } finally {
-            clearInterval(progressInterval)
             setProcessingProgress(100)
             setIsProcessing(false)
             console.log("Processing finished (finally block)");
@@ -26,6 +26,7 @@ class User(Base):
     prescriptions = relationship("Prescription", back_populates="user", cascade="all, delete")
     reminders = relationship("MedicationReminder", back_populates="user", cascade="all, delete")
     chats = relationship("ChatLog", back_populates="user", cascade="all, delete")
+    chat_memory = relationship("ChatMemory", back_populates="user", uselist=False, cascade="all, delete")
 
 class SymptomDataset(Base):
     __tablename__ = "symptoms_dataset"
@@ -96,3 +97,48 @@ class ChatLog(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="chats")
+
+class ChatMemory(Base):
+    __tablename__ = "chat_memories"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), unique=True, index=True)
+    summary = Column(Text, default="")  # rolling summary of turns older than the prompt window
+    summarized_until = Column(DateTime(timezone=True), nullable=True)  # timestamp of the last ChatLog folded in
+    summarized_turns = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User", back_populates="chat_memory")
+
+class PrescriptionJob(Base):
+    __tablename__ = "prescription_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), index=True)
+    file_name = Column(String)
+    content_hash = Column(String, ForeignKey("prescription_contents.sha256"), nullable=True)
+    status = Column(String, default="queued", index=True)  # queued, running, succeeded, partial, failed
+    stage = Column(String, default="queued")  # queued, ocr, parsing, reminders, done
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)  # OCR output kept across retries
+    prescription_id = Column(String, ForeignKey("prescriptions.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # lease renewed while a worker runs the job
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    prescription = relationship("Prescription")
+
+class PrescriptionContent(Base):
+    __tablename__ = "prescription_contents"
+
+    sha256 = Column(String, primary_key=True)  # hash of the uploaded bytes
+    file_name = Column(String)  # stored once under uploads/prescriptions as <sha256>.<ext>
+    size_bytes = Column(Integer)
+    ocr_text = Column(Text, nullable=True)
+    ocr = Column(JSON, nullable=True)  # per-page timings of the OCR run that produced ocr_text
+    medications = Column(JSON, nullable=True)
+    uploads = Column(Integer, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    parsed_at = Column(DateTime(timezone=True), nullable=True)
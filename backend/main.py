@@ -1,5 +1,9 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from auth.auth_routes import router as auth_router
 from routes.user import router as user_router
@@ -10,13 +14,48 @@ from routes.reminders import router as reminder_router
 from routes.chat import router as chat_router
 from routes.symptoms_list import router as symptoms_list_router
 from routes.stats import router as stats_router
+from routes.drugs import router as drugs_router
 
 from db.database import Base, engine
+from services.model_registry import registry
+from services.inference_engine import engine as inference_engine
+from services.llm_gateway import llm_gateway
+from services.semantic_cache import semantic_cache
+from services.embedding_service import embedding_service
+from services.ocr_pool import ocr_pool
+from services.prescription_jobs import prescription_jobs
+
+# MODEL_WARMUP: load ML artifacts in a background task once the app starts serving.
+# MODEL_PRELOAD: load them at import time instead, e.g. under `gunicorn --preload`
+# so forked workers share the loaded pages copy-on-write.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "false").lower() == "true"
+
+if MODEL_PRELOAD:
+    registry.warm_up()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await llm_gateway.start()
+    prescription_jobs.start()
+    warm_up_task = None
+    if MODEL_WARMUP and not registry.ready():
+        warm_up_task = asyncio.create_task(asyncio.to_thread(registry.warm_up))
+    yield
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+    await inference_engine.shutdown()
+    await embedding_service.shutdown()
+    await prescription_jobs.shutdown()
+    ocr_pool.shutdown()
+    await llm_gateway.close()
+    semantic_cache.save()
 
 app = FastAPI(
     title="GoHealthy Backend",
     description="Symptom analysis → Disease prediction → Drug recommendation → Guideline chatbot → Alerts",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 Base.metadata.create_all(bind=engine)
@@ -38,7 +77,21 @@ app.include_router(prescription_router)
 app.include_router(reminder_router)
 app.include_router(chat_router)
 app.include_router(stats_router)
+app.include_router(drugs_router)
 
 @app.get("/")
 def root():
-    return {"message": "GoHealthy Backend is Live!"}
\ No newline at end of file
+    return {"message": "GoHealthy Backend is Live!"}
+
+@app.get("/health")
+def health():
+    return registry.status()
+
+@app.get("/health/ready")
+def readiness():
+    status = registry.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+@app.get("/health/llm")
+def llm_health():
+    return llm_gateway.stats()
\ No newline at end of file
@@ -1,20 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
+import json
 from db.models import User
 from schemas.schemas import ChatRequest, DiseaseRequest
 from db.database import get_db
 from auth.auth_routes import get_current_user
-from services.drug_info import chat_about_drug, mapped_disease, mapped_drugs_list
+from services.drug_info import chat_about_drug, stream_chat_about_drug
+from services.drug_catalog import drug_catalog
+from services.semantic_cache import semantic_cache
+from services.embedding_service import embedding_service
+from services.conversation_memory import conversation_memory
 
 router = APIRouter(prefix="/chat", tags=["Chat with AI"])
 
 def get_drugs_list(disease):
-    mappinng_list = mapped_disease()
-    mappedDisease = mappinng_list.get(disease)
-    matched_drugs = mapped_drugs_list(mappedDisease)
-    return matched_drugs
+    return drug_catalog.drugs_for_predicted_disease(disease)
+
+
+async def sse_chat_events(body: ChatRequest, current_user: User):
+    try:
+        async for event, data in stream_chat_about_drug(
+            user=current_user,
+            message=body.message,
+            disease=body.disease,
+            drug=body.drug,
+            suggested_drugs=get_drugs_list(disease=body.disease)
+        ):
+            if event == "token":
+                yield f"data: {json.dumps(data)}\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
 
 
 @router.post("/", tags=["AI Chat"])
@@ -29,7 +49,18 @@ async def chat_with_bot(
     - Greeting + suggested drugs
     - Context-aware drug Q&A
     - DB logging (inside the service)
+
+    With `stream: true` the reply is sent as Server-Sent Events: one
+    `data: {"token": ...}` event per chunk, then an `event: done` with the
+    full answer (or `event: error`).
     """
+    if body.stream:
+        return StreamingResponse(
+            sse_chat_events(body, current_user),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
     try:
         response = await chat_about_drug(
             user=current_user,
@@ -41,4 +72,20 @@ async def chat_with_bot(
         )
         return response
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats", tags=["AI Chat"])
+def chat_cache_stats():
+    return semantic_cache.stats()
+
+
+@router.get("/embeddings/stats", tags=["AI Chat"])
+def embedding_stats():
+    return embedding_service.stats()
+
+
+
+@router.get("/memory/stats", tags=["AI Chat"])
+def conversation_memory_stats():
+    return conversation_memory.stats()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.drug_resolver import drug_resolver, RESOLVE_LIMIT
+
+router = APIRouter(prefix="/drugs", tags=["Drugs"])
+
+@router.get("/resolve")
+def resolve_drug(q: str, limit: int = Query(RESOLVE_LIMIT, ge=1, le=20)):
+    """
+    Catalog drug names closest to `q`, tolerating typos and common synonyms.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    return {"query": q, "matches": drug_resolver.resolve(q, limit=limit)}
+
+@router.get("/resolve/stats")
+def resolver_stats():
+    return drug_resolver.stats()
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, status
+from fastapi.responses import StreamingResponse
+from anyio import from_thread
 from sqlalchemy.orm import Session
 from uuid import UUID
 from db.database import get_db
 from db.models import Prediction, UserQuery, SymptomDataset, User
-from schemas.schemas import PredictionCreate, PredictionOut, UserQueryOut, PredictionCreate
-from services.prediction import prepare_model_input, predict_disease
+from schemas.schemas import PredictionCreate, PredictionOut, UserQueryOut, PredictionCreate, BatchPredictionRequest
+from services.prediction import prepare_sparse_input, prepare_gender_input
+from services.inference_engine import engine
+from services.prediction_cache import prediction_cache
+from services.batch_prediction import stream_batch_predictions, MAX_PROFILES
 from auth.auth_routes import get_current_user
 from typing import List, Dict
 import json
@@ -23,26 +28,26 @@ def predict_disease_endpoint(
     if not user_details:
         raise HTTPException(status_code=404, detail="User details not found")
 
-    def prepareGenderInput(gender):
-        if gender == "male":
-            return "M"
-        elif gender == "female":
-            return "F"
-        else:
-            return "Any"
     print(user_details)
     # Prepare model input
-    input_df = prepare_model_input(
+    input_row = prepare_sparse_input(
         symptom_list=[symptom for symptom, val in symptoms.items() if val == 1],
-        gender=prepareGenderInput(user_details.gender),
+        gender=prepare_gender_input(user_details.gender),
         smoking=user_details.smoking,
         age=user_details.age,
         alcohol=user_details.alcohol_consumption,
         height_cm=user_details.height_cm,
         weight_kg=user_details.weight_kg
     )
-    # Predict disease
-    predicted_disease, confidence, top_3 = predict_disease(input_df)
+    # Predict disease: repeated feature rows are served from the cache, the rest
+    # are batched with concurrent requests by the inference engine. The handler
+    # stays sync so its DB work runs in the threadpool; only the wait for the
+    # batched result hops onto the event loop.
+    result = prediction_cache.get(input_row)
+    if result is None:
+        result = from_thread.run(engine.predict, input_row)
+        prediction_cache.put(input_row, result)
+    predicted_disease, confidence, top_3 = result
 
     # Update symptoms record with predicted disease
     symptom_record = db.query(SymptomDataset).filter(
@@ -99,6 +104,37 @@ def predict_disease_endpoint(
         "top_3": top_3
     }
 
+@router.post("/batch")
+def predict_disease_batch_endpoint(
+    body: BatchPredictionRequest,
+    user: User = Depends(get_current_user)
+):
+    """
+    Score many symptom profiles in one request. Results stream back as NDJSON,
+    one line per profile followed by a summary line.
+    """
+    if not body.profiles:
+        raise HTTPException(status_code=400, detail="No profiles submitted")
+    if len(body.profiles) > MAX_PROFILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PROFILES} profiles per batch")
+    # Profiles may only reference the caller: a batch reads the user's details and writes to their history
+    foreign = [i for i, p in enumerate(body.profiles) if p.user_id and str(p.user_id) != str(user.id)]
+    if foreign:
+        raise HTTPException(status_code=403, detail=f"Profiles {foreign[:10]} reference another user")
+
+    return StreamingResponse(
+        stream_batch_predictions(body.profiles, default_user_id=user.id, chunk_size=body.chunk_size),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/engine/stats")
+def get_inference_engine_stats():
+    return engine.stats()
+
+@router.get("/cache/stats")
+def get_prediction_cache_stats():
+    return prediction_cache.stats()
+
 @router.get("/user/{user_id}", response_model=List[PredictionOut])
 def get_user_predictions(user_id: UUID, db: Session = Depends(get_db)):
     user_queries = db.query(UserQuery).filter(UserQuery.user_id == user_id).all()
@@ -1,88 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
 from sqlalchemy.orm import Session
 from uuid import UUID
 import shutil, os, json
 from datetime import datetime
 
 from db.database import get_db
-from db.models import Prescription, MedicationReminder, User
-from schemas.schemas import PrescriptionOut
+from db.models import PrescriptionJob, User
+from schemas.schemas import PrescriptionJobOut
 from auth.auth_routes import get_current_user
-from utils.ocr import extract_text_from_image, extract_text_from_pdf
-from utils.pdf_img_parser import extract_prescription_data
+from services.ocr_pool import ocr_pool
+from services.prescription_jobs import prescription_jobs, job_status, QueueFullError
+from services.upload_store import upload_store, UploadTooLargeError
 
 router = APIRouter(prefix="/prescriptions", tags=["Prescriptions"])
 
-UPLOAD_DIR = "uploads/prescriptions"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-@router.post("/upload", response_model=PrescriptionOut)
+@router.post("/upload", response_model=PrescriptionJobOut, status_code=202)
 async def upload_prescription(
+    response: Response,
     file: UploadFile = File(...), 
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Stores the file and queues it for background processing (OCR, medication
+    extraction, reminders). Poll /prescriptions/jobs/{job_id} for progress.
+    A file that was processed before is answered at once (200, job succeeded).
+    """
     file_ext = file.filename.split(".")[-1].lower()
     if file_ext not in ["png", "jpg", "jpeg", "pdf"]:
         raise HTTPException(status_code=400, detail="Unsupported file type. Please upload an image or PDF.")
 
-    file_bytes = file.file.read()
-    if file_ext == "pdf":
-        extracted_text = extract_text_from_pdf(file_bytes)
-    else:
-        extracted_text = extract_text_from_image(file_bytes)
+    # Streamed to disk in chunks and stored once per content hash;
+    # identical re-uploads reuse the file and its results
+    try:
+        content, _ = await upload_store.put_upload(db, file, file_ext)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        job = prescription_jobs.enqueue(db, current_user.id, content)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    if job.status == "succeeded":
+        response.status_code = 200
+    return job_status(job)
+
 
-    # Save the file locally
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    file_name = f"{current_user.id}_{timestamp}.{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    with open(file_path, "wb") as f:
-        f.write(file_bytes)
+@router.get("/jobs/stats")
+def prescription_job_stats():
+    return prescription_jobs.stats()
 
-    # Save to DB
-    prescription = Prescription(
-        user_id=current_user.id,
-        file_name=file_name,
-        extracted_data={"text": extracted_text}
+
+@router.get("/jobs/{job_id}", response_model=PrescriptionJobOut)
+def get_prescription_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = (
+        db.query(PrescriptionJob)
+        .filter(PrescriptionJob.id == job_id, PrescriptionJob.user_id == current_user.id)
+        .first()
     )
-    
-    try:
-        med_schedule_result = await extract_prescription_data(file_path)
-        med_schedule = med_schedule_result.get("medications", [])
-        # general_advice = med_schedule_result.get("general_advice", "")
-        prescription.extracted_data = {
-            "text": extracted_text,
-            "medications": med_schedule,
-            # "general_advice": general_advice
-        }
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_status(job)
 
-        for item in med_schedule:
-            # Convert start_date and end_date to date objects or None
-            start_date_str = item.get("start_date")
-            end_date_str = item.get("end_date")
 
-            def parse_date(date_str):
-                if date_str and date_str.strip():
-                    try:
-                        return datetime.strptime(date_str, "%Y-%m-%d").date()
-                    except Exception:
-                        return None
-                return None
+@router.get("/uploads/stats")
+def upload_store_stats(db: Session = Depends(get_db)):
+    return upload_store.stats(db)
 
-            reminder = MedicationReminder(
-                user_id=current_user.id,
-                drug_name=item.get("drug_name"),
-                dosage=item.get("dosage"),
-                timing=item.get("timing"),
-                start_date=parse_date(start_date_str),
-                end_date=parse_date(end_date_str)
-            )
-            db.add(reminder)
-        db.commit()
-    except Exception as e:
-        print("⚠️ Failed to extract medication schedule:", str(e))
-    db.add(prescription)
-    db.commit()
-    db.refresh(prescription)
 
-    return prescription
+@router.get("/ocr/stats")
+def ocr_stats():
+    return ocr_pool.stats()
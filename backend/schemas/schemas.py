@@ -114,6 +114,21 @@ class PredictionOutput(BaseModel):
     class Config:
         orm_mode = True
 
+# Bulk prediction: each profile either references a user or carries its own demographics
+class BatchPredictionProfile(BaseModel):
+    symptoms: Dict[str, int]
+    user_id: Optional[str] = None
+    gender: Optional[str] = None
+    smoking: Optional[str] = None
+    alcohol_consumption: Optional[str] = None
+    age: Optional[int] = None
+    height_cm: Optional[float] = None
+    weight_kg: Optional[float] = None
+
+class BatchPredictionRequest(BaseModel):
+    profiles: List[BatchPredictionProfile]
+    chunk_size: Optional[int] = None
+
 # -------------------- Prescription --------------------
 class PrescriptionUpload(BaseModel):
     user_id: UUID
@@ -129,6 +144,20 @@ class PrescriptionOut(BaseModel):
     class Config:
         orm_mode = True
 
+# Background processing of an uploaded prescription
+class PrescriptionJobOut(BaseModel):
+    job_id: str
+    status: str  # queued, running, succeeded, partial, failed
+    stage: str  # queued, ocr, parsing, reminders, done
+    progress: int
+    attempts: int
+    error: Optional[str] = None
+    prescription_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    prescription: Optional[PrescriptionOut] = None
+
 # -------------------- Medication Reminder --------------------
 class MedicationReminderBase(BaseModel):
     drug_name: str
@@ -172,6 +201,7 @@ class ChatRequest(BaseModel):
     disease: Optional[str] = None
     drug: Optional[str] = None
     suggested_drugs: Optional[List[str]] = None
+    stream: Optional[bool] = False
 
 class ChatResponse(BaseModel):
     answer: str
\ No newline at end of file
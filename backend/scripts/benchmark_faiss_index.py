@@ -0,0 +1,141 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import gc
+import json
+import time
+import pickle
+import random
+import resource
+import tempfile
+import argparse
+import faiss
+import numpy as np
+from types import SimpleNamespace
+
+from scripts.build_faiss_index import (
+    INDEX_PATH, FLAT_INDEX_FILE, GUIDELINE_FILE, INDEX_TYPES, make_index, load_embeddings,
+)
+
+QUESTION_TEMPLATES = [
+    "What is the dosage of {drug}?",
+    "What are the side effects of {drug}?",
+    "Can I take {drug} during pregnancy?",
+    "How does {drug} work?",
+    "What should not be taken with {drug}?",
+]
+
+
+def rss_mb() -> float:
+    # Current resident set size (Linux); ru_maxrss only reports the peak
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def build_queries(n: int, seed: int = 0) -> np.ndarray:
+    with open(GUIDELINE_FILE, "r", encoding="utf-8") as f:
+        drugs = list(json.load(f))
+    rng = random.Random(seed)
+    questions = [rng.choice(QUESTION_TEMPLATES).format(drug=rng.choice(drugs)) for _ in range(n)]
+    return np.asarray(load_embeddings().embed_documents(questions), dtype=np.float32)
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.asarray(latencies), np.stack(results)
+
+
+def read(path: str, mmap: bool):
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def retriever_rss_mb(path: str, docstore, index_to_docstore_id, queries: np.ndarray, k: int, mmap: bool) -> float:
+    """
+    RSS added by a GuidelineRetriever over the index at `path` (serving
+    index, exact flat index, BM25 and per-drug sub-indexes) after a round
+    of drug-scoped queries.
+    """
+    from services.retrieval import GuidelineRetriever
+
+    gc.collect()
+    before = rss_mb()
+    vectorstore = SimpleNamespace(index=read(path, mmap), docstore=docstore, index_to_docstore_id=index_to_docstore_id)
+    retriever = GuidelineRetriever(vectorstore, read(os.path.join(INDEX_PATH, FLAT_INDEX_FILE), mmap))
+    drugs = sorted(retriever.sub_indexes)
+    for i, q in enumerate(queries):
+        retriever.search(q, k, drug=drugs[i % len(drugs)] if drugs else None)
+    used = rss_mb() - before
+    del retriever, vectorstore
+    gc.collect()
+    return used
+
+
+def benchmark(index_types, n_queries: int = 200, k: int = 5, mmap: bool = True) -> list:
+    """
+    Build each index type from flat.faiss, write it to disk, reload it the way
+    the app does and compare its top-k against the exact flat results. RAM is
+    reported for the bare index and for the whole retriever built on it.
+    """
+    flat = faiss.read_index(os.path.join(INDEX_PATH, FLAT_INDEX_FILE))
+    with open(os.path.join(INDEX_PATH, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    queries = build_queries(n_queries)
+    _, truth = time_queries(flat, queries, k)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index_type in index_types:
+            start = time.perf_counter()
+            built = make_index(flat, index_type)
+            build_seconds = time.perf_counter() - start
+            path = os.path.join(tmp, f"{index_type}.faiss")
+            faiss.write_index(built, path)
+            if built is not flat:
+                del built
+            gc.collect()
+
+            before = rss_mb()
+            index = read(path, mmap)
+            loaded_rss = rss_mb() - before
+
+            time_queries(index, queries[:10], k)  # warm caches
+            latencies, found = time_queries(index, queries, k)
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+            rows.append({
+                "index": index_type,
+                "vectors": int(index.ntotal),
+                "recall@%d" % k: round(float(recall), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                "disk_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+                "ram_mb": round(max(loaded_rss, 0.0), 2),
+                "retriever_ram_mb": round(max(retriever_rss_mb(path, docstore, index_to_docstore_id,
+                                                               queries, k, mmap), 0.0), 2),
+                "build_seconds": round(build_seconds, 2),
+            })
+            del index
+            gc.collect()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare FAISS index types against the flat baseline")
+    parser.add_argument("--types", nargs="+", default=sorted(INDEX_TYPES), choices=sorted(INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--no-mmap", action="store_true", help="read indexes fully into memory")
+    args = parser.parse_args()
+
+    for row in benchmark(args.types, args.queries, args.k, mmap=not args.no_mmap):
+        print(json.dumps(row))
@@ -0,0 +1,85 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import tempfile
+import argparse
+import subprocess
+from PIL import Image, ImageDraw
+
+# Runs in a fresh interpreter so peak RSS only reflects one mode
+PROBE = """
+import json, sys, time, resource
+from pdf2image import convert_from_path
+import pytesseract
+from utils.ocr import iter_pdf_pages, OCR_PDF_DPI
+
+mode, pdf_path, run_ocr = sys.argv[1], sys.argv[2], sys.argv[3] == "1"
+start = time.perf_counter()
+chars = 0
+if mode == "all-pages":
+    # Previous behaviour: rasterize the whole document up front
+    pages = convert_from_path(pdf_path, dpi=OCR_PDF_DPI)
+    for page in pages:
+        chars += len(pytesseract.image_to_string(page)) if run_ocr else 0
+else:
+    for _, page in iter_pdf_pages(pdf_path):
+        chars += len(pytesseract.image_to_string(page)) if run_ocr else 0
+        page.close()
+print(json.dumps({
+    "seconds": round(time.perf_counter() - start, 2),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "chars": chars,
+}))
+"""
+
+LINES = [
+    "Dr. A. Sharma, MBBS MD - General Physician",
+    "Patient: John Doe    Age: 42    Date: 12-03-2025",
+    "Rx",
+    "1. Tab Paracetamol 500mg   1-0-1   x 5 days   after food",
+    "2. Cap Amoxicillin 250mg   1-1-1   x 7 days",
+    "3. Syp Cetirizine 5ml      0-0-1   x 3 days",
+    "Advice: drink plenty of fluids, review after one week.",
+]
+
+
+def make_pdf(path: str, pages: int, dpi: int = 150):
+    """
+    A scanned-looking prescription PDF: every page is an A4 image of text.
+    """
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    images = []
+    for number in range(pages):
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        y = dpi // 2
+        while y < height - dpi:
+            for line in LINES:
+                draw.text((dpi // 2, y), f"{line}  (page {number + 1})", fill=0)
+                y += dpi // 4
+        images.append(image.convert("RGB"))
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+
+
+def measure(mode: str, pdf_path: str, run_ocr: bool) -> dict:
+    backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    output = subprocess.run([sys.executable, "-c", PROBE, mode, pdf_path, "1" if run_ocr else "0"],
+                            cwd=backend_dir, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of whole-document vs page-by-page PDF OCR")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--no-ocr", action="store_true", help="only rasterize, skip tesseract")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = os.path.join(tmp, f"prescription_{pages}.pdf")
+            make_pdf(pdf_path, pages)
+            for mode in ["all-pages", "page-stream"]:
+                row = {"pages": pages, "mode": mode, "pdf_kb": round(os.path.getsize(pdf_path) / 1024, 1)}
+                row.update(measure(mode, pdf_path, not args.no_ocr))
+                print(json.dumps(row))
@@ -0,0 +1,130 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import random
+import argparse
+import numpy as np
+import pytesseract
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from utils.ocr import preprocess_image, OCR_TARGET_DPI
+
+DOCTORS = ["Dr. A. Sharma, MBBS MD", "Dr. R. Iyer, MBBS DNB", "Dr. S. Khan, MBBS MS"]
+DRUGS = [("Tab", "Paracetamol", "500mg"), ("Cap", "Amoxicillin", "250mg"), ("Tab", "Metformin", "500mg"),
+         ("Tab", "Amlodipine", "5mg"), ("Syp", "Cetirizine", "5ml"), ("Tab", "Pantoprazole", "40mg"),
+         ("Tab", "Azithromycin", "500mg"), ("Tab", "Atorvastatin", "10mg")]
+SCHEDULES = ["1-0-1", "1-1-1", "0-0-1", "1-0-0"]
+
+
+def prescription_lines(rng: random.Random) -> list:
+    lines = [rng.choice(DOCTORS), f"Patient: Case {rng.randint(100, 999)}   Age: {rng.randint(18, 80)}", "Rx"]
+    for number, (form, drug, dose) in enumerate(rng.sample(DRUGS, rng.randint(2, 5)), start=1):
+        lines.append(f"{number}. {form} {drug} {dose} {rng.choice(SCHEDULES)} x {rng.randint(3, 14)} days")
+    lines.append("Review after one week.")
+    return lines
+
+
+def render_page(lines: list, dpi: int = 300) -> Image.Image:
+    """
+    A clean A5 prescription at `dpi`.
+    """
+    width, height = int(5.83 * dpi), int(8.27 * dpi)
+    font = ImageFont.load_default(size=dpi // 8)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    y = dpi // 2
+    for line in lines:
+        draw.text((dpi // 2, y), line, fill=0, font=font)
+        y += dpi // 4
+    return page
+
+
+def photograph(page: Image.Image, rng: random.Random, megapixels: float = 12.0) -> Image.Image:
+    """
+    Make a clean page look like a phone photo: lying skewed on a darker
+    table, with a lighting gradient and sensor noise, at `megapixels`.
+    """
+    page = page.rotate(rng.uniform(-6, 6), resample=Image.BICUBIC, expand=True, fillcolor=120)
+    canvas = Image.new("L", (int(page.width * 1.3), int(page.height * 1.3)), 110)
+    canvas.paste(page, (rng.randint(0, canvas.width - page.width), rng.randint(0, canvas.height - page.height)))
+
+    scale = (megapixels * 1e6 / (canvas.width * canvas.height)) ** 0.5
+    canvas = canvas.resize((int(canvas.width * scale), int(canvas.height * scale)), Image.BICUBIC)
+    canvas = canvas.filter(ImageFilter.GaussianBlur(radius=1.2))
+
+    pixels = np.asarray(canvas, dtype=np.float32)
+    gradient = np.linspace(0.65, 1.0, pixels.shape[1], dtype=np.float32)[None, :]
+    noise = np.random.default_rng(rng.randint(0, 2**32 - 1)).normal(0, 8, pixels.shape)
+    return Image.fromarray(np.clip(pixels * gradient + noise, 0, 255).astype(np.uint8)).convert("RGB")
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(predicted: str, truth: str) -> float:
+    predicted, truth = normalize(predicted), normalize(truth)
+    return max(0.0, 1 - edit_distance(predicted, truth) / max(1, len(truth)))
+
+
+def summarize(name: str, latencies: list, accuracies: list) -> dict:
+    return {
+        "pipeline": name,
+        "ocr_ms_p50": round(float(np.percentile(latencies, 50)), 1),
+        "ocr_ms_p95": round(float(np.percentile(latencies, 95)), 1),
+        "char_accuracy_mean": round(float(np.mean(accuracies)), 4),
+        "char_accuracy_min": round(float(np.min(accuracies)), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR latency and character accuracy with and without preprocessing")
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--megapixels", type=float, default=12.0)
+    parser.add_argument("--target-dpi", type=int, default=OCR_TARGET_DPI)
+    parser.add_argument("--no-binarize", action="store_true")
+    parser.add_argument("--no-deskew", action="store_true")
+    parser.add_argument("--no-crop", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = []
+    for _ in range(args.images):
+        lines = prescription_lines(rng)
+        corpus.append(("\n".join(lines), photograph(render_page(lines), rng, args.megapixels)))
+
+    results = {"raw": ([], []), "preprocessed": ([], [])}
+    for truth, photo in corpus:
+        start = time.perf_counter()
+        text = pytesseract.image_to_string(photo)
+        results["raw"][0].append((time.perf_counter() - start) * 1000)
+        results["raw"][1].append(char_accuracy(text, truth))
+
+        # Preprocessing counts toward latency; it runs in the same OCR task
+        start = time.perf_counter()
+        page = preprocess_image(photo, target_dpi=args.target_dpi, do_binarize=not args.no_binarize,
+                                do_deskew=not args.no_deskew, do_crop=not args.no_crop)
+        text = pytesseract.image_to_string(page)
+        results["preprocessed"][0].append((time.perf_counter() - start) * 1000)
+        results["preprocessed"][1].append(char_accuracy(text, truth))
+
+    print(json.dumps({
+        "images": args.images,
+        "megapixels": args.megapixels,
+        "settings": {"target_dpi": args.target_dpi, "binarize": not args.no_binarize,
+                     "deskew": not args.no_deskew, "crop": not args.no_crop},
+        "results": [summarize(name, *values) for name, values in results.items()],
+    }, indent=2))
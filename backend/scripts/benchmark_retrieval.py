@@ -0,0 +1,86 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import random
+import argparse
+import numpy as np
+
+from services.model_registry import registry
+from services.drug_catalog import GUIDELINE_FILE
+import services.drug_info  # registers the embedding model and vectorstore
+from services.retrieval import embed_query
+
+# (question template, guideline section that answers it)
+QUERY_TEMPLATES = [
+    ("What is the dosage of {drug} for adults?", "dosage"),
+    ("{drug} side effects", "side effects"),
+    ("Who should not take {drug}?", "contraindications"),
+    ("What does {drug} interact with?", "interactions"),
+    ("How does {drug} work in the body?", "mechanism"),
+    ("What is {drug} used for?", "indications"),
+]
+
+
+def build_queries(n: int, seed: int = 0) -> list:
+    """
+    Labelled queries generated from drugs-Info.json: the relevant documents
+    are the chunks of the named drug, ideally from the matching section.
+    """
+    with open(GUIDELINE_FILE, "r", encoding="utf-8") as f:
+        guidelines = json.load(f)
+    rng = random.Random(seed)
+    drugs = rng.sample(list(guidelines), min(n, len(guidelines)))
+    queries = []
+    for drug in drugs:
+        template, section = rng.choice(QUERY_TEMPLATES)
+        queries.append({"query": template.format(drug=drug), "drug": drug.strip().lower(), "section": section})
+    return queries
+
+
+def evaluate(retriever, queries: list, mode: str, k: int = 5) -> dict:
+    drug_hits = section_hits = 0
+    reciprocal_ranks, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        if mode == "vector":
+            docs = retriever.search(embed_query(q["query"]), k=k)
+        elif mode == "bm25":
+            docs = retriever._documents(retriever._lexical_ranking(q["query"], k, None))
+        else:
+            docs = retriever.hybrid_search(q["query"], k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        drugs = [(d.metadata.get("drug") or "").strip().lower() for d in docs]
+        sections = [(d.metadata.get("section") or "").lower() for d in docs]
+        relevant = [drug == q["drug"] for drug in drugs]
+        drug_hits += any(relevant)
+        section_hits += any(r and q["section"] in s for r, s in zip(relevant, sections))
+        reciprocal_ranks.append(1.0 / (relevant.index(True) + 1) if any(relevant) else 0.0)
+
+    n = len(queries)
+    return {
+        "mode": mode,
+        "queries": n,
+        "drug_hit@%d" % k: round(drug_hits / n, 4),
+        "section_hit@%d" % k: round(section_hits / n, 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline relevance benchmark for guideline retrieval")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["vector", "bm25", "hybrid"])
+    args = parser.parse_args()
+
+    retriever = registry.get("guideline_retriever")
+    queries = build_queries(args.queries)
+    short_circuited = sum(retriever.match_drug(q["query"]) is not None for q in queries)
+    print(json.dumps({"exact_name_short_circuits": short_circuited, "queries": len(queries)}))
+    for mode in args.modes:
+        print(json.dumps(evaluate(retriever, queries, mode, args.k)))
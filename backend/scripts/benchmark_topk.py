@@ -0,0 +1,88 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from services.feature_encoder import SparseRows
+from services.numpy_model import NumpyMLP
+from services.prediction import top_k
+
+N_FEATURES = 383        # 377 symptom columns + 6 demographic columns
+SYMPTOMS_PER_ROW = 6
+HIDDEN_UNITS = 256
+DISEASE_COUNTS = [100, 1000, 10000, 50000]
+BATCH_SIZES = [1, 32, 256]
+K = 3
+
+
+def _timeit(fn, repeat: int = 20) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def legacy_top_k(probs, label_encoder):
+    # The original per-row argsort + inverse_transform
+    results = []
+    for row in probs:
+        indices = np.argsort(row)[-K:][::-1]
+        results.append((label_encoder.inverse_transform(indices), row[indices]))
+    return results
+
+
+def current_top_k(probs, labels):
+    indices, conf = top_k(probs, K)
+    return labels[indices], conf
+
+
+def random_sparse_rows(rng, batch_size: int) -> SparseRows:
+    rows = []
+    for _ in range(batch_size):
+        symptoms = np.sort(rng.choice(N_FEATURES - 6, SYMPTOMS_PER_ROW, replace=False))
+        indices = np.concatenate([symptoms, np.arange(N_FEATURES - 6, N_FEATURES)]).astype(np.int32)
+        values = np.concatenate([np.ones(SYMPTOMS_PER_ROW), rng.normal(size=6)]).astype(np.float32)
+        rows.append(SparseRows(np.array([0, len(indices)]), indices, values, N_FEATURES))
+    return SparseRows.concat(rows)
+
+
+def random_model(rng, n_diseases: int) -> NumpyMLP:
+    return NumpyMLP([
+        {"type": "dense", "activation": "relu",
+         "kernel": rng.normal(size=(N_FEATURES, HIDDEN_UNITS)).astype(np.float32),
+         "bias": np.zeros(HIDDEN_UNITS, dtype=np.float32)},
+        {"type": "dense", "activation": "softmax",
+         "kernel": rng.normal(size=(HIDDEN_UNITS, n_diseases)).astype(np.float32),
+         "bias": np.zeros(n_diseases, dtype=np.float32)},
+    ])
+
+
+def run():
+    rng = np.random.default_rng(0)
+    print(f"{'diseases':>9} {'batch':>6} | {'argsort+inverse ms':>18} {'argpartition ms':>16} | "
+          f"{'dense fwd ms':>12} {'sparse fwd ms':>13}")
+
+    for n_diseases in DISEASE_COUNTS:
+        label_encoder = LabelEncoder().fit([f"disease_{i:05d}" for i in range(n_diseases)])
+        labels = np.asarray(label_encoder.classes_)
+        model = random_model(rng, n_diseases)
+
+        for batch_size in BATCH_SIZES:
+            probs = rng.random((batch_size, n_diseases)).astype(np.float32)
+            rows = random_sparse_rows(rng, batch_size)
+            dense = rows.to_dense()
+
+            legacy_ms = _timeit(lambda: legacy_top_k(probs, label_encoder))
+            current_ms = _timeit(lambda: current_top_k(probs, labels))
+            dense_ms = _timeit(lambda: model.predict(dense), repeat=5)
+            sparse_ms = _timeit(lambda: model.predict_sparse(rows), repeat=5)
+
+            print(f"{n_diseases:>9} {batch_size:>6} | {legacy_ms:>18.3f} {current_ms:>16.3f} | "
+                  f"{dense_ms:>12.3f} {sparse_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,4 +1,9 @@
-import os, json
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json, math, time, hashlib, argparse
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
@@ -6,26 +11,230 @@ from langchain_core.documents import Document
 
 load_dotenv()
 
-GUIDELINE_FILE = "C:/Users/KIIT/Navikenz/Capstone Project/guideline_app/backend/data/drugs-Info.json"
-INDEX_PATH = "./faiss_store"
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+GUIDELINE_FILE = os.getenv("GUIDELINE_FILE", os.path.join(BACKEND_DIR, "data", "drugs-Info.json"))
+INDEX_PATH = os.getenv("INDEX_PATH", os.path.join(BACKEND_DIR, "faiss_store"))
+MANIFEST_FILE = "manifest.json"
+# Exact copy of every embedding; the source of truth for incremental updates
+# and the baseline for benchmark_faiss_index.py
+FLAT_INDEX_FILE = "flat.faiss"
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+CHUNK_TOKENS = int(os.getenv("INDEX_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.getenv("INDEX_CHUNK_OVERLAP", "30"))
+EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("INDEX_EMBED_WORKERS", str(os.cpu_count() or 1)))
+
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+INDEX_NLIST = int(os.getenv("INDEX_NLIST", "0"))  # 0 = derive from corpus size
+INDEX_NPROBE = int(os.getenv("INDEX_NPROBE", "8"))
+INDEX_PQ_M = int(os.getenv("INDEX_PQ_M", "48"))
+INDEX_HNSW_M = int(os.getenv("INDEX_HNSW_M", "32"))
+INDEX_EF_SEARCH = int(os.getenv("INDEX_EF_SEARCH", "64"))
+
+# faiss.index_factory strings per serving index type
+INDEX_TYPES = {
+    "flat": "Flat",
+    "ivf-flat": "IVF{nlist},Flat",
+    "ivf-pq": "IVF{nlist},PQ{pq_m}x8",
+    "hnsw": "HNSW{hnsw_m}",
+    "sq8": "SQ8",
+}
+
+
+def format_section(value) -> str:
+    if isinstance(value, dict):
+        return "\n".join(f"{k}: {format_section(v)}" for k, v in value.items() if v)
+    if isinstance(value, list):
+        return "; ".join(format_section(v) for v in value if v)
+    return str(value)
+
+
+def drug_hash(sections: dict) -> str:
+    return hashlib.sha256(json.dumps(sections, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Chunker:
+    """
+    Splits a section into windows of at most `max_tokens` tokens (counted
+    with the embedding model's tokenizer when available, whitespace words
+    otherwise) with `overlap` tokens shared between neighbouring windows.
+    """
+
+    def __init__(self, tokenizer=None, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap = min(overlap, max_tokens // 2)
+
+    def _word_tokens(self, words: list) -> list:
+        if self.tokenizer is None:
+            return [1] * len(words)
+        return [max(1, len(self.tokenizer.tokenize(w))) for w in words]
+
+    def split(self, text: str) -> list:
+        words = text.split()
+        counts = self._word_tokens(words)
+        if sum(counts) <= self.max_tokens:
+            return [text]
+
+        chunks, start = [], 0
+        while start < len(words):
+            # Grow the window word by word until the token budget is reached
+            end, used = start, 0
+            while end < len(words) and (end == start or used + counts[end] <= self.max_tokens):
+                used += counts[end]
+                end += 1
+            chunks.append(" ".join(words[start:end]))
+            if end >= len(words):
+                break
+            # Step back far enough to share `overlap` tokens with the next window
+            back, shared = end, 0
+            while back - 1 > start and shared + counts[back - 1] <= self.overlap:
+                back -= 1
+                shared += counts[back]
+            start = back
+        return chunks
+
+
+def drug_documents(drug: str, sections: dict, chunker: Chunker):
+    """
+    One document per section window, with ids stable across runs.
+    """
+    docs, ids = [], []
+    for section, value in sections.items():
+        if not value:
+            continue
+        body = format_section(value)
+        for i, chunk in enumerate(chunker.split(body)):
+            docs.append(Document(
+                page_content=f"drug: {drug}\n{section}: {chunk}",
+                metadata={"drug": drug, "section": section, "chunk": i},
+            ))
+            ids.append(f"{drug}::{section}::{i}")
+    return docs, ids
+
+
+def load_embeddings():
+    import torch
+    torch.set_num_threads(max(1, EMBED_WORKERS))
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        encode_kwargs={"batch_size": EMBED_BATCH_SIZE},
+    )
+
+
+def embed_documents(embeddings, docs) -> np.ndarray:
+    texts = [d.page_content for d in docs]
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def make_index(flat_index, index_type: str = INDEX_TYPE):
+    """
+    Build the serving index from the exact flat index. Vectors are added in
+    the same order, so FAISS ids (and the docstore mapping) stay unchanged.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {sorted(INDEX_TYPES)}")
+    if index_type == "flat":
+        return flat_index
+
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    # ~4*sqrt(n) lists, but keep at least 39 training points per list
+    nlist = INDEX_NLIST or max(1, min(int(4 * math.sqrt(len(vectors))), len(vectors) // 39))
+    spec = INDEX_TYPES[index_type].format(nlist=nlist, pq_m=INDEX_PQ_M, hnsw_m=INDEX_HNSW_M)
+
+    index = faiss.index_factory(flat_index.d, spec, flat_index.metric_type)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+
+    if index_type.startswith("ivf"):
+        faiss.extract_index_ivf(index).nprobe = INDEX_NPROBE
+    elif index_type == "hnsw":
+        index.hnsw.efSearch = INDEX_EF_SEARCH
+    return index
+
+
+def load_manifest(index_path: str) -> dict:
+    path = os.path.join(index_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
-def build_index():
+def save_manifest(index_path: str, manifest: dict):
+    path = os.path.join(index_path, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def build_index(full_rebuild: bool = False, index_type: str = INDEX_TYPE):
+    start = time.perf_counter()
     with open(GUIDELINE_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    docs = []
-    for drug, sections in data.items():
-        content = "\n".join([f"{k}: {v}" for k, v in sections.items() if v])
-        docs.append(Document(page_content=content, metadata={"drug": drug}))
+    embeddings = load_embeddings()
+    tokenizer = getattr(getattr(embeddings, "_client", None) or getattr(embeddings, "client", None), "tokenizer", None)
+    chunker = Chunker(tokenizer)
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2"
-    )
+    settings = {"model": EMBEDDING_MODEL_NAME, "chunk_tokens": CHUNK_TOKENS, "chunk_overlap": CHUNK_OVERLAP}
+    manifest = load_manifest(INDEX_PATH)
+    incremental = (not full_rebuild and manifest.get("settings") == settings
+                   and os.path.exists(os.path.join(INDEX_PATH, FLAT_INDEX_FILE)))
+    previous = manifest.get("drugs", {}) if incremental else {}
+
+    hashes = {drug: drug_hash(sections) for drug, sections in data.items()}
+    changed = [drug for drug in data if previous.get(drug, {}).get("hash") != hashes[drug]]
+    removed = [drug for drug in previous if drug not in data]
+
+    docs, ids, drug_ids = [], [], {}
+    for drug in changed:
+        drug_docs, doc_ids = drug_documents(drug, data[drug], chunker)
+        docs.extend(drug_docs)
+        ids.extend(doc_ids)
+        drug_ids[drug] = doc_ids
 
-    vectorstore = FAISS.from_documents(docs, embedding=embeddings)
+    vectors = embed_documents(embeddings, docs) if docs else np.zeros((0, 0), dtype=np.float32)
+    text_embeddings = list(zip([d.page_content for d in docs], vectors.tolist()))
+    metadatas = [d.metadata for d in docs]
+
+    flat_path = os.path.join(INDEX_PATH, FLAT_INDEX_FILE)
+    if incremental:
+        vectorstore = FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+        vectorstore.index = faiss.read_index(flat_path)
+        stale_ids = [i for drug in changed + removed for i in previous.get(drug, {}).get("ids", [])]
+        if stale_ids:
+            vectorstore.delete(stale_ids)
+        if text_embeddings:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    else:
+        vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+
+    os.makedirs(INDEX_PATH, exist_ok=True)
+    faiss.write_index(vectorstore.index, flat_path)
+    vectorstore.index = make_index(vectorstore.index, index_type)
     vectorstore.save_local(INDEX_PATH)
 
-    print(f"FAISS index built and saved to {INDEX_PATH}")
+    drugs_manifest = {drug: entry for drug, entry in previous.items() if drug in data and drug not in changed}
+    for drug in changed:
+        drugs_manifest[drug] = {"hash": hashes[drug], "ids": drug_ids[drug]}
+    save_manifest(INDEX_PATH, {"settings": settings, "drugs": drugs_manifest})
+
+    mode = "incremental" if incremental else "full"
+    print(f"FAISS {index_type} index ({mode}) saved to {INDEX_PATH}: {len(changed)} drug(s) re-embedded "
+          f"into {len(docs)} chunk(s), {len(removed)} removed, {time.perf_counter() - start:.1f}s")
+
 
 if __name__ == "__main__":
-    build_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the guideline FAISS index")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild from scratch")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=sorted(INDEX_TYPES),
+                        help="serving index type written to index.faiss")
+    args = parser.parse_args()
+    build_index(full_rebuild=args.full, index_type=args.index_type)
@@ -0,0 +1,75 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import joblib
+import numpy as np
+import pandas as pd
+
+from services.feature_encoder import FeatureEncoder, NON_SYMPTOM_COLS
+
+ASSETS_DIR = "./data/Model Artifacts/Saved Assets"
+N_PROFILES = 1000
+
+le_gender = joblib.load(f"{ASSETS_DIR}/le_gender.pkl")
+le_smoking = joblib.load(f"{ASSETS_DIR}/le_smoking.pkl")
+le_alcohol = joblib.load(f"{ASSETS_DIR}/le_alcohol.pkl")
+scaler = joblib.load(f"{ASSETS_DIR}/scaler.pkl")
+input_columns = joblib.load(f"{ASSETS_DIR}/input_columns.pkl")
+
+
+def legacy_prepare_model_input(symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg):
+    """
+    The original dict/DataFrame implementation of prepare_model_input.
+    """
+    inputs = {col: 0 for col in input_columns if col not in NON_SYMPTOM_COLS}
+    for symptom in symptom_list:
+        if symptom in inputs:
+            inputs[symptom] = 1
+
+    for col, encoder, value in [("gender_enc", le_gender, gender),
+                                ("smoking_enc", le_smoking, smoking),
+                                ("alcohol_enc", le_alcohol, alcohol)]:
+        if value and value in encoder.classes_:
+            inputs[col] = encoder.transform([value])[0]
+        else:
+            inputs[col] = encoder.transform([encoder.classes_[0]])[0]
+
+    scaled_values = scaler.transform(pd.DataFrame([[age, height_cm, weight_kg]], columns=scaler.feature_names_in_))
+    inputs['age_scaled'] = scaled_values[0][0]
+    inputs['height_scaled'] = scaled_values[0][1]
+    inputs['weight_scaled'] = scaled_values[0][2]
+
+    return pd.DataFrame([inputs])
+
+
+def random_profile(rng: random.Random, symptoms):
+    return {
+        "symptom_list": rng.sample(symptoms, rng.randint(0, 12)) + (["not a symptom"] if rng.random() < 0.1 else []),
+        "gender": rng.choice(list(le_gender.classes_) + [None, "", "unknown"]),
+        "smoking": rng.choice(list(le_smoking.classes_) + [None, ""]),
+        "alcohol": rng.choice(list(le_alcohol.classes_) + [None, "Daily"]),
+        "age": rng.randint(1, 95),
+        "height_cm": rng.uniform(50, 210),
+        "weight_kg": rng.uniform(3, 180),
+    }
+
+
+def check_parity(n_profiles: int = N_PROFILES, seed: int = 0):
+    encoder = FeatureEncoder(input_columns, le_gender, le_smoking, le_alcohol, scaler)
+    symptoms = list(encoder.symptom_index)
+    rng = random.Random(seed)
+    profiles = [random_profile(rng, symptoms) for _ in range(n_profiles)]
+
+    batch = encoder.encode_batch(profiles)
+    for i, profile in enumerate(profiles):
+        expected = np.array(legacy_prepare_model_input(**profile), dtype=np.float32)
+        single = encoder.encode(**profile)
+        np.testing.assert_allclose(single, expected, rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(batch[i], expected[0], rtol=1e-6, atol=1e-6)
+
+    print(f"Encoder matches legacy prepare_model_input on {n_profiles} randomized profiles")
+
+
+if __name__ == "__main__":
+    check_parity()
@@ -0,0 +1,92 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import numpy as np
+from keras.models import load_model
+
+from services.numpy_model import NumpyMLP, ACTIVATIONS
+
+KERAS_MODEL_PATH = "./data/Model Artifacts/disease_model.keras"
+NUMPY_MODEL_PATH = "./data/Model Artifacts/disease_model.npz"
+
+# Layers that are identity at inference time
+PASSTHROUGH_LAYERS = {"InputLayer", "Dropout", "GaussianNoise", "GaussianDropout", "AlphaDropout"}
+
+
+def _activation_name(layer) -> str:
+    activation = layer.get_config().get("activation", "linear")
+    if isinstance(activation, dict):
+        activation = activation.get("config", {}).get("name") or activation.get("class_name", "linear")
+    activation = str(activation).lower()
+    if activation not in ACTIVATIONS:
+        raise ValueError(f"Layer '{layer.name}' uses unsupported activation '{activation}'")
+    return activation
+
+
+def export_layers(model):
+    """
+    Convert the Keras layers into the spec + arrays understood by NumpyMLP.
+    BatchNormalization is folded into a per-feature scale/shift.
+    """
+    spec, arrays = [], {}
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        i = len(spec)
+        if kind in PASSTHROUGH_LAYERS:
+            continue
+        if kind == "Dense":
+            weights = layer.get_weights()
+            kernel = weights[0]
+            bias = weights[1] if len(weights) > 1 else np.zeros(kernel.shape[1], dtype=np.float32)
+            arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+            arrays[f"bias_{i}"] = bias.astype(np.float32)
+            spec.append({"type": "dense", "activation": _activation_name(layer)})
+        elif kind == "BatchNormalization":
+            config = layer.get_config()
+            weights = list(layer.get_weights())
+            gamma = weights.pop(0) if config.get("scale", True) else 1.0
+            beta = weights.pop(0) if config.get("center", True) else 0.0
+            moving_mean, moving_var = weights
+            scale = gamma / np.sqrt(moving_var + config.get("epsilon", 1e-3))
+            arrays[f"scale_{i}"] = np.asarray(scale, dtype=np.float32)
+            arrays[f"shift_{i}"] = np.asarray(beta - moving_mean * scale, dtype=np.float32)
+            spec.append({"type": "affine", "activation": "linear"})
+        elif kind == "Activation":
+            spec.append({"type": "activation", "activation": _activation_name(layer)})
+        else:
+            raise ValueError(f"Cannot export layer '{layer.name}' of type {kind}")
+    return spec, arrays
+
+
+def check_parity(model, numpy_model: NumpyMLP, n_rows: int = 512, seed: int = 0) -> float:
+    """
+    Compare Keras and NumPy outputs on random sparse binary rows with
+    standardized numeric tail features; returns the max absolute difference.
+    """
+    rng = np.random.default_rng(seed)
+    n_features = model.input_shape[-1]
+    x = (rng.random((n_rows, n_features)) < 0.02).astype(np.float32)
+    x[:, -3:] = rng.normal(size=(n_rows, 3))
+    expected = model.predict(x, verbose=0)
+    actual = numpy_model.predict(x)
+    max_diff = float(np.abs(expected - actual).max())
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+    if not (expected.argmax(axis=1) == actual.argmax(axis=1)).all():
+        raise AssertionError("Top-1 predictions differ between Keras and NumPy")
+    return max_diff
+
+
+def export(keras_path: str = KERAS_MODEL_PATH, output_path: str = NUMPY_MODEL_PATH):
+    model = load_model(keras_path)
+    spec, arrays = export_layers(model)
+    np.savez(output_path, spec=np.array(json.dumps(spec)), **arrays)
+
+    max_diff = check_parity(model, NumpyMLP.load(output_path))
+    size_kb = os.path.getsize(output_path) / 1024
+    print(f"Exported {len(spec)} layers to {output_path} ({size_kb:.0f} KB), "
+          f"max abs diff vs Keras: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    export()
@@ -0,0 +1,94 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+
+from services.model_registry import registry
+import services.drug_info  # registers the embedding model
+from services.embedding_service import EmbeddingService
+
+QUESTIONS = [
+    "What is the usual adult dose?",
+    "Can I drink alcohol while taking this?",
+    "Is it safe during pregnancy?",
+    "What are the common side effects?",
+    "How long does it take to work?",
+    "Can children take this medicine?",
+    "What happens if I miss a dose?",
+    "Does it interact with ibuprofen?",
+]
+
+TICK_SECONDS = 0.005
+
+
+async def monitor_lag(samples: list, stop: asyncio.Event):
+    # How late the loop wakes a coroutine that asked to sleep one tick
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append((time.perf_counter() - start - TICK_SECONDS) * 1000)
+
+
+async def run(mode: str, requests: int, concurrency: int, service: EmbeddingService) -> dict:
+    """
+    Fire `requests` question embeddings, `concurrency` at a time, either
+    inline on the event loop (the old path) or through the embedding
+    service, while measuring event-loop lag.
+    """
+    model = registry.get("embedding_model")
+    rng = random.Random(0)
+    questions = [f"{rng.choice(QUESTIONS)} ({i})" for i in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question: str):
+        async with semaphore:
+            if mode == "inline":
+                model.embed_query(question)
+            else:
+                await service.embed(question)
+
+    lag, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(lag, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    result = {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_per_s": round(requests / elapsed, 1),
+        "loop_lag_p50_ms": round(float(np.percentile(lag, 50)), 2) if lag else None,
+        "loop_lag_p99_ms": round(float(np.percentile(lag, 99)), 2) if lag else None,
+        "loop_lag_max_ms": round(max(lag), 2) if lag else None,
+        "lag_samples": len(lag),
+    }
+    if mode == "service":
+        stats = service.stats()
+        result["avg_batch_size"] = stats["avg_batch_size"]
+        result["batches"] = stats["batches"]
+    return result
+
+
+async def main(args):
+    registry.get("embedding_model").embed_query("warm up")
+    for mode in args.modes:
+        service = EmbeddingService(workers=args.workers)
+        print(json.dumps(await run(mode, args.requests, args.concurrency, service)))
+        await service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-loop lag and throughput of query embedding")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=["inline", "service"], choices=["inline", "service"])
+    asyncio.run(main(parser.parse_args()))
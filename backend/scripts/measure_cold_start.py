@@ -0,0 +1,41 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import subprocess
+
+# Runs in a fresh interpreter so nothing is cached from this process
+PROBE = """
+import json, time, resource, os
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+import_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+result = {"import_seconds": round(imported, 3), "import_peak_rss_mb": round(import_rss / 1024, 1)}
+if os.getenv("MEASURE_WARM_UP") == "true":
+    from services.model_registry import registry
+    start = time.perf_counter()
+    registry.warm_up()
+    result["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+    result["warm_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result["artifacts"] = registry.status()["artifacts"]
+print(json.dumps(result))
+"""
+
+
+def measure(warm_up: bool = True) -> dict:
+    """
+    Import the app the way a uvicorn worker does and report import time and
+    peak RSS, then (optionally) the cost of loading every registered artifact.
+    Run from the backend directory, before and after a change, to compare.
+    """
+    env = dict(os.environ, MODEL_WARMUP="false", MODEL_PRELOAD="false",
+               MEASURE_WARM_UP="true" if warm_up else "false")
+    backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print(json.dumps(measure(warm_up="--no-warm-up" not in sys.argv), indent=2))
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import random
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Local stand-in for the Groq chat-completions endpoint. Run with
+#   uvicorn scripts.stub_llm_server:app --port 8081
+# and start the backend with
+#   GROQ_API_URL=http://127.0.0.1:8081/openai/v1/chat/completions
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "200"))
+STUB_FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+STUB_REPLY = os.getenv("STUB_REPLY", "This is a stubbed answer.")
+STUB_TOKEN_DELAY_MS = float(os.getenv("STUB_TOKEN_DELAY_MS", "20"))
+
+app = FastAPI(title="Stub LLM server")
+stats = {"requests": 0, "failures": 0}
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    stats["requests"] += 1
+    await asyncio.sleep(STUB_LATENCY_MS / 1000)
+
+    if random.random() < STUB_FAILURE_RATE:
+        stats["failures"] += 1
+        status = random.choice([429, 500, 503])
+        return JSONResponse(status_code=status, content={"error": {"message": "stubbed failure"}},
+                            headers={"retry-after": "0"} if status == 429 else None)
+
+    if payload.get("stream"):
+        return StreamingResponse(stream_reply(payload), media_type="text/event-stream")
+
+    return {
+        "id": f"stub-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": STUB_REPLY},
+            "finish_reason": "stop",
+        }],
+    }
+
+
+async def stream_reply(payload: dict):
+    # OpenAI-style chunks: one delta per word, then [DONE]
+    words = STUB_REPLY.split(" ")
+    for i, word in enumerate(words):
+        chunk = {
+            "id": f"stub-{stats['requests']}",
+            "object": "chat.completion.chunk",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(STUB_TOKEN_DELAY_MS / 1000)
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
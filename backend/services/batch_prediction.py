@@ -0,0 +1,130 @@
+import os
+import json
+import logging
+from typing import List, Iterator, Optional
+
+from db.database import SessionLocal
+from db.models import User, UserQuery, Prediction
+from schemas.schemas import BatchPredictionProfile
+from services.feature_encoder import SparseRows
+from services.prediction import get_encoder, predict_batch, prepare_gender_input
+
+logger = logging.getLogger("batch_prediction")
+
+CHUNK_SIZE = int(os.getenv("BATCH_PREDICTION_CHUNK_SIZE", "256"))
+MAX_PROFILES = int(os.getenv("BATCH_PREDICTION_MAX_PROFILES", "10000"))
+
+DEMOGRAPHIC_FIELDS = ["gender", "smoking", "alcohol_consumption", "age", "height_cm", "weight_kg"]
+
+
+def resolve_profile(profile: BatchPredictionProfile, users: dict, default_user_id: str) -> dict:
+    """
+    Merge inline demographics over the referenced user's stored details and
+    return the owner id plus the keyword arguments for the feature encoder.
+    Only the calling user (`default_user_id`) may be referenced.
+    """
+    details = {}
+    owner_id = default_user_id
+    if profile.user_id:
+        if str(profile.user_id) != str(default_user_id):
+            raise PermissionError(f"Not allowed to predict for user {profile.user_id}")
+        user = users.get(profile.user_id)
+        if not user:
+            raise ValueError(f"User {profile.user_id} not found")
+        owner_id = user.id
+        details = {field: getattr(user, field) for field in DEMOGRAPHIC_FIELDS}
+
+    for field in DEMOGRAPHIC_FIELDS:
+        value = getattr(profile, field)
+        if value is not None:
+            details[field] = value
+
+    return {
+        "user_id": owner_id,
+        "encoder_args": {
+            "symptom_list": [symptom for symptom, val in profile.symptoms.items() if val == 1],
+            "gender": prepare_gender_input(details.get("gender")),
+            "smoking": details.get("smoking"),
+            "alcohol": details.get("alcohol_consumption"),
+            "age": details.get("age"),
+            "height_cm": details.get("height_cm"),
+            "weight_kg": details.get("weight_kg"),
+        },
+    }
+
+
+def stream_batch_predictions(profiles: List[BatchPredictionProfile],
+                             default_user_id: str,
+                             chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Encode profiles as sparse index rows and score them chunk by chunk,
+    yielding one NDJSON line per profile as soon as its chunk is scored.
+    All UserQuery/Prediction rows are written in a single transaction that
+    is committed after the last chunk; the final line reports whether it
+    was persisted.
+    """
+    chunk_size = max(1, min(chunk_size or CHUNK_SIZE, CHUNK_SIZE * 16))
+    db = SessionLocal()
+    try:
+        user_ids = {p.user_id for p in profiles if p.user_id}
+        users = {}
+        if user_ids:
+            users = {u.id: u for u in db.query(User).filter(User.id.in_(user_ids)).all()}
+
+        encoder = get_encoder()
+        succeeded = failed = 0
+
+        for start in range(0, len(profiles), chunk_size):
+            chunk = profiles[start:start + chunk_size]
+            rows, encoded = [], []
+            for offset, profile in enumerate(chunk):
+                index = start + offset
+                try:
+                    resolved = resolve_profile(profile, users, default_user_id)
+                    encoded.append(encoder.encode_sparse(**resolved["encoder_args"]))
+                    rows.append((index, profile, resolved["user_id"]))
+                except Exception as e:
+                    failed += 1
+                    yield json.dumps({"index": index, "error": str(e)}) + "\n"
+
+            if not rows:
+                continue
+
+            results = predict_batch(SparseRows.concat(encoded))
+            for (index, profile, user_id), (top_prediction, confidence, top_3) in zip(rows, results):
+                user_query = UserQuery(user_id=user_id, symptoms=profile.symptoms)
+                db.add(user_query)
+                db.add(Prediction(
+                    query=user_query,
+                    top_prediction=str(top_prediction),
+                    confidence=confidence,
+                    top_3=[{str(label): conf} for label, conf in top_3],
+                ))
+                succeeded += 1
+                yield json.dumps({
+                    "index": index,
+                    "user_id": user_id,
+                    "predicted_disease": str(top_prediction),
+                    "confidence": confidence,
+                    "top_3": [[str(label), conf] for label, conf in top_3],
+                }) + "\n"
+
+            # Push the chunk to the open transaction so pending objects don't pile up in memory
+            db.flush()
+
+        try:
+            db.commit()
+            persisted = True
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Batch prediction commit failed: {e}")
+            persisted = False
+
+        yield json.dumps({"summary": {
+            "total": len(profiles),
+            "succeeded": succeeded,
+            "failed": failed,
+            "persisted": persisted,
+        }}) + "\n"
+    finally:
+        db.close()
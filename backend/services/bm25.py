@@ -0,0 +1,86 @@
+import re
+import math
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+# "500mg" -> "500mg", "500", "mg" so both the dose and its parts match
+DOSE_RE = re.compile(r"^([0-9]+(?:\.[0-9]+)?)([a-z]+)$")
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        dose = DOSE_RE.match(token)
+        if dose:
+            tokens.extend(dose.groups())
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents. Postings are kept as numpy
+    arrays per term, so a query only touches the documents that contain
+    one of its terms. Document positions are the caller's ids (for the
+    guideline store, the FAISS ids).
+    """
+
+    def __init__(self, texts: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        self.n_docs = len(lengths)
+        self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(self.doc_lengths.mean()) if self.n_docs else 0.0
+        # Per-document part of the BM25 denominator, computed once
+        self.length_norm = k1 * (1 - b + b * self.doc_lengths / avg_length) if avg_length else self.doc_lengths
+
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        for term, entries in postings.items():
+            ids = np.fromiter((d for d, _ in entries), dtype=np.int64, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            self.postings[term] = (ids, tfs)
+            self.idf[term] = math.log(1 + (self.n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+
+    def scores(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            weights = self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.length_norm[ids])
+            for doc_id, weight in zip(ids.tolist(), weights.tolist()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return scores
+
+    def search(self, query: str, k: int = 10, candidates: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k (doc id, score) pairs, optionally restricted to `candidates`.
+        """
+        scores = self.scores(query)
+        if candidates is not None:
+            allowed = set(int(c) for c in candidates)
+            scores = {d: s for d, s in scores.items() if d in allowed}
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Iterable[int]], k: int = 60) -> List[int]:
+    """
+    Merge ranked id lists; each list contributes 1 / (k + rank) per id.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda d: -fused[d])
@@ -0,0 +1,277 @@
+import os
+import math
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import ChatLog, ChatMemory
+from services.llm_gateway import llm_gateway
+
+logger = logging.getLogger("conversation_memory")
+
+# Rough Llama-3 estimate; budgets are conservative rather than exact
+CHARS_PER_TOKEN = float(os.getenv("CHAT_CHARS_PER_TOKEN", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKENS", "1200"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKENS", "800"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("CHAT_SUMMARY_TOKENS", "250"))
+# Summarize once this many turns have fallen out of the history window
+SUMMARIZE_AFTER_TURNS = int(os.getenv("CHAT_SUMMARIZE_AFTER_TURNS", "4"))
+SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "llama3-8b-8192")
+# Upper bound on turns folded per summary call, so a long backlog is caught up gradually
+SUMMARY_MAX_FOLD_TURNS = 20
+SUMMARY_TURN_TOKENS = 200
+
+MIN_PARTIAL_TOKENS = 50
+
+
+def count_tokens(text: Optional[str]) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    cut = text[:max(int(budget * CHARS_PER_TOKEN) - 1, 0)]
+    # Don't end mid-word
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut + "…"
+
+
+def trim_context(passages: List[str], budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Join retrieved passages in rank order until `budget` tokens are used;
+    the first passage that doesn't fit is truncated if enough room is left.
+    """
+    parts, used = [], 0
+    for passage in passages:
+        remaining = budget - used
+        tokens = count_tokens(passage) + 1
+        if tokens <= remaining:
+            parts.append(passage)
+            used += tokens
+            continue
+        if remaining >= MIN_PARTIAL_TOKENS:
+            parts.append(truncate_to_tokens(passage, remaining - 1))
+        break
+    return "\n\n".join(parts)
+
+
+def turn_messages(entry: ChatLog) -> List[Dict[str, str]]:
+    return [
+        {"role": "user", "content": entry.user_message + f"drug: {entry.drug_name}"},
+        {"role": "assistant", "content": entry.bot_response},
+    ]
+
+
+def turn_tokens(entry: ChatLog) -> int:
+    return sum(count_tokens(m["content"]) for m in turn_messages(entry))
+
+
+def truncated_turn_messages(entry: ChatLog, budget: int) -> List[Dict[str, str]]:
+    """
+    A turn cut to `budget` tokens: the question gets up to half, the reply the rest.
+    """
+    question, reply = turn_messages(entry)
+    question_budget = min(count_tokens(question["content"]), budget // 2)
+    return [
+        {"role": "user", "content": truncate_to_tokens(question["content"], question_budget)},
+        {"role": "assistant", "content": truncate_to_tokens(reply["content"] or "", budget - question_budget)},
+    ]
+
+
+class ConversationMemory:
+    """
+    Keeps the chat prompt a constant size: the newest turns are replayed
+    verbatim up to `history_budget` tokens, older turns are folded into a
+    per-user rolling summary (at most `summary_budget` tokens, stored in
+    chat_memories) and retrieved guideline context is cut to
+    `context_budget`. Summaries are refreshed in the background after a
+    reply, once `summarize_after` turns have left the verbatim window.
+    """
+
+    def __init__(self,
+                 history_budget: int = HISTORY_TOKEN_BUDGET,
+                 summary_budget: int = SUMMARY_TOKEN_BUDGET,
+                 context_budget: int = CONTEXT_TOKEN_BUDGET,
+                 summarize_after: int = SUMMARIZE_AFTER_TURNS,
+                 summary_model: str = SUMMARY_MODEL):
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.context_budget = context_budget
+        self.summarize_after = max(1, summarize_after)
+        self.summary_model = summary_model
+
+        self._pending = set()
+        self._tasks = set()  # strong references, so running summaries aren't garbage-collected
+        self.summaries = 0
+        self.summary_failures = 0
+
+    # ---------- reading ----------
+    def _window(self, newest_first: List[ChatLog], max_turns: int) -> Tuple[List[ChatLog], List[ChatLog]]:
+        """
+        Split unsummarized turns into (kept verbatim, oldest first) and (overflow, oldest first).
+        The newest turn is always kept, even when it alone exceeds the budget
+        (`history` truncates it), so a follow-up never loses its context.
+        """
+        kept, used = [], 0
+        for entry in newest_first[:max(1, max_turns)]:
+            tokens = turn_tokens(entry)
+            if kept and used + tokens > self.history_budget:
+                break
+            kept.append(entry)
+            used += tokens
+        overflow = newest_first[len(kept):]
+        return kept[::-1], overflow[::-1]
+
+    @staticmethod
+    def _unsummarized_query(db: Session, user_id: str, memory: Optional[ChatMemory]):
+        query = db.query(ChatLog).filter(ChatLog.user_id == user_id)
+        if memory is not None and memory.summarized_until is not None:
+            query = query.filter(ChatLog.timestamp > memory.summarized_until)
+        return query
+
+    def _unsummarized(self, db: Session, user_id: str, memory: Optional[ChatMemory], limit: int) -> List[ChatLog]:
+        """
+        The newest `limit` unsummarized turns, newest first.
+        """
+        return (self._unsummarized_query(db, user_id, memory)
+                    .order_by(ChatLog.timestamp.desc())
+                    .limit(limit)
+                    .all())
+
+    def _load_history(self, user_id: str, memory_limit: int) -> List[Dict[str, str]]:
+        db = SessionLocal()
+        try:
+            memory = db.query(ChatMemory).filter(ChatMemory.user_id == user_id).first()
+            kept, _ = self._window(self._unsummarized(db, user_id, memory, memory_limit), memory_limit)
+
+            messages = []
+            if memory is not None and memory.summary:
+                messages.append({
+                    "role": "system",
+                    "content": "Summary of the earlier conversation with this user:\n"
+                               + truncate_to_tokens(memory.summary, self.summary_budget),
+                })
+            for entry in kept:
+                if turn_tokens(entry) > self.history_budget:
+                    messages.extend(truncated_turn_messages(entry, self.history_budget))
+                else:
+                    messages.extend(turn_messages(entry))
+            return messages
+        finally:
+            db.close()
+
+    async def history(self, user_id: str, memory_limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Prompt messages for the conversation so far: the rolling summary (if
+        any) followed by the newest turns that fit the history budget. Read
+        in a worker thread with its own session.
+        """
+        return await asyncio.to_thread(self._load_history, user_id, memory_limit)
+
+    def context(self, passages: List[str]) -> str:
+        return trim_context(passages, self.context_budget)
+
+    # ---------- summarizing ----------
+    def schedule_summary(self, user_id: str, memory_limit: int = 10):
+        """
+        Refresh the user's summary in the background; no-op if one is
+        already running for them.
+        """
+        if user_id in self._pending:
+            return
+        self._pending.add(user_id)
+        task = asyncio.get_running_loop().create_task(self.summarize(user_id, memory_limit))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._pending.discard(user_id))
+
+    def _turns_to_fold(self, user_id: str, memory_limit: int) -> Optional[Tuple[Optional[str], list]]:
+        """
+        (current summary, oldest unsummarized turns to fold into it), or None
+        while fewer than `summarize_after` turns have left the history window.
+        Turns are returned as plain tuples so they outlive the session.
+        """
+        db = SessionLocal()
+        try:
+            memory = db.query(ChatMemory).filter(ChatMemory.user_id == user_id).first()
+            kept, _ = self._window(self._unsummarized(db, user_id, memory, memory_limit), memory_limit)
+            pending = self._unsummarized_query(db, user_id, memory).count() - len(kept)
+            if pending < self.summarize_after:
+                return None
+            # Fold the oldest unsummarized turns first, a bounded number per call
+            overflow = (self._unsummarized_query(db, user_id, memory)
+                            .order_by(ChatLog.timestamp.asc())
+                            .limit(min(pending, SUMMARY_MAX_FOLD_TURNS))
+                            .all())
+            previous = memory.summary if memory is not None else None
+            return previous, [(e.drug_name, e.user_message, e.bot_response, e.timestamp) for e in overflow]
+        finally:
+            db.close()
+
+    def _save_summary(self, user_id: str, summary: str, summarized_until, folded: int):
+        db = SessionLocal()
+        try:
+            memory = db.query(ChatMemory).filter(ChatMemory.user_id == user_id).first()
+            if memory is None:
+                memory = ChatMemory(user_id=user_id, summarized_turns=0)
+                db.add(memory)
+            memory.summary = truncate_to_tokens(summary.strip(), self.summary_budget)
+            memory.summarized_until = summarized_until
+            memory.summarized_turns = (memory.summarized_turns or 0) + folded
+            db.commit()
+        finally:
+            db.close()
+
+    async def summarize(self, user_id: str, memory_limit: int = 10):
+        """
+        Fold turns that left the history window into the rolling summary. The
+        database reads and the write run in worker threads; only the LLM call
+        is awaited on the event loop.
+        """
+        due = await asyncio.to_thread(self._turns_to_fold, user_id, memory_limit)
+        if due is None:
+            return
+        previous, overflow = due
+
+        transcript = "\n".join(
+            f"User ({drug or 'general'}): {truncate_to_tokens(question or '', SUMMARY_TURN_TOKENS)}\n"
+            f"Assistant: {truncate_to_tokens(answer or '', SUMMARY_TURN_TOKENS)}"
+            for drug, question, answer, _ in overflow
+        )
+        prompt = [
+            {"role": "system", "content": (
+                "You maintain a running summary of a patient's conversation with a medical drug assistant. "
+                "Merge the new turns into the existing summary. Keep drugs discussed, the patient's "
+                "conditions, doses and concerns; drop greetings and repetition. "
+                f"Answer with the summary only, under {int(self.summary_budget * 0.75)} words."
+            )},
+            {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+        ]
+        try:
+            summary = await llm_gateway.chat(prompt, model=self.summary_model)
+        except Exception as e:
+            # The turns stay unsummarized and are retried after the next reply
+            self.summary_failures += 1
+            logger.warning(f"Conversation summary failed for user {user_id}: {e}")
+            return
+
+        await asyncio.to_thread(self._save_summary, user_id, summary, overflow[-1][3], len(overflow))
+        self.summaries += 1
+
+    def stats(self) -> dict:
+        return {
+            "history_budget_tokens": self.history_budget,
+            "summary_budget_tokens": self.summary_budget,
+            "context_budget_tokens": self.context_budget,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "pending": len(self._pending),
+        }
+
+
+conversation_memory = ConversationMemory()
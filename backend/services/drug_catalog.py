@@ -0,0 +1,143 @@
+import os
+import csv
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("drug_catalog")
+
+MAPPING_FILE = "./data/Mapped_diseases.json"
+DRUG_DISEASE_FILE = "./data/cleaned_drug_disease.csv"
+GUIDELINE_FILE = "./data/drugs-Info.json"
+
+RELOAD_CHECK_SECONDS = float(os.getenv("DRUG_CATALOG_RELOAD_CHECK_SECONDS", "10"))
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class DrugCatalog:
+    """
+    In-memory view of the drug/disease data files: predicted disease ->
+    mapped disease, disease -> drugs, drug -> diseases and drug -> guideline
+    sections. Files are parsed once and re-parsed only when their mtime
+    changes (checked at most every `check_interval` seconds).
+    """
+
+    def __init__(self,
+                 mapping_file: str = MAPPING_FILE,
+                 drug_disease_file: str = DRUG_DISEASE_FILE,
+                 guideline_file: str = GUIDELINE_FILE,
+                 check_interval: float = RELOAD_CHECK_SECONDS):
+        self.files = [mapping_file, drug_disease_file, guideline_file]
+        self.mapping_file = mapping_file
+        self.drug_disease_file = drug_disease_file
+        self.guideline_file = guideline_file
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._last_check = 0.0
+        self.reloads = 0
+
+        self.disease_mapping: Dict[str, str] = {}
+        self.disease_to_drugs: Dict[str, List[str]] = {}
+        self.drug_to_diseases: Dict[str, List[str]] = {}
+        self.guidelines: Dict[str, dict] = {}
+
+    def _load(self):
+        with open(self.mapping_file, "r", encoding="utf-8") as f:
+            disease_mapping = json.load(f)
+
+        disease_to_drugs: Dict[str, Dict[str, None]] = {}
+        drug_to_diseases: Dict[str, Dict[str, None]] = {}
+        with open(self.drug_disease_file, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                disease, drug = row.get("disease"), row.get("drug")
+                if not disease or not drug:
+                    continue
+                # dicts keep first-seen order, like pandas .unique()
+                disease_to_drugs.setdefault(disease, {})[drug] = None
+                drug_to_diseases.setdefault(drug, {})[disease] = None
+
+        with open(self.guideline_file, "r", encoding="utf-8") as f:
+            guidelines = json.load(f)
+
+        self.disease_mapping = disease_mapping
+        self.disease_to_drugs = {k: list(v) for k, v in disease_to_drugs.items()}
+        self.drug_to_diseases = {k: list(v) for k, v in drug_to_diseases.items()}
+        self.guidelines = guidelines
+        self.reloads += 1
+        logger.info(f"Loaded drug catalog: {len(self.disease_to_drugs)} diseases, "
+                    f"{len(self.drug_to_diseases)} drugs, {len(self.guidelines)} guidelines")
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._mtimes is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._mtimes is not None and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            mtimes = [_mtime(path) for path in self.files]
+            if mtimes != self._mtimes:
+                try:
+                    self._load()
+                    self._mtimes = mtimes
+                except Exception as e:
+                    if self._mtimes is None:
+                        raise Exception(f"Failed to load drug catalog: {e}")
+                    # Keep serving the previous snapshot if a file is mid-write
+                    logger.warning(f"Drug catalog reload failed, keeping previous data: {e}")
+
+    def map_disease(self, disease: Optional[str]) -> Optional[str]:
+        self._ensure_fresh()
+        return self.disease_mapping.get(disease)
+
+    def drugs_for_disease(self, disease: Optional[str]) -> List[str]:
+        self._ensure_fresh()
+        return list(self.disease_to_drugs.get(disease, []))
+
+    def diseases_for_drug(self, drug: Optional[str]) -> List[str]:
+        self._ensure_fresh()
+        return list(self.drug_to_diseases.get(drug, []))
+
+    def drugs_for_predicted_disease(self, disease: Optional[str]) -> List[str]:
+        """
+        Drugs for a disease as predicted by the model (mapped to the drug dataset's naming).
+        """
+        return self.drugs_for_disease(self.map_disease(disease))
+
+    def all_disease_mappings(self) -> Dict[str, str]:
+        self._ensure_fresh()
+        return self.disease_mapping
+
+    def guideline(self, drug: str) -> Optional[dict]:
+        self._ensure_fresh()
+        return self.guidelines.get(drug)
+
+    def all_guidelines(self) -> Dict[str, dict]:
+        self._ensure_fresh()
+        return self.guidelines
+
+    def all_drug_names(self) -> List[str]:
+        self._ensure_fresh()
+        return list(dict.fromkeys(list(self.guidelines) + list(self.drug_to_diseases)))
+
+    def stats(self) -> dict:
+        return {
+            "diseases": len(self.disease_to_drugs),
+            "drugs": len(self.drug_to_diseases),
+            "guidelines": len(self.guidelines),
+            "mapped_diseases": len(self.disease_mapping),
+            "reloads": self.reloads,
+        }
+
+
+drug_catalog = DrugCatalog()
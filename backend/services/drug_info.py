@@ -1,83 +1,71 @@
 import os
-import json
-import httpx, pandas as pd
-from typing import List, Dict, Optional
+import time
+import asyncio
+from typing import List, Dict, Optional, AsyncIterator, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from sqlalchemy.orm import Session
 
+from db.database import SessionLocal
 from db.models import ChatLog, User
+from services.model_registry import registry
+from services.drug_catalog import drug_catalog
+from services.drug_resolver import drug_resolver
+from services.llm_gateway import llm_gateway
+from services.semantic_cache import semantic_cache, normalize_question
+from services.embedding_service import embedding_service
+from services.conversation_memory import conversation_memory
+import services.retrieval  # registers the guideline retriever
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama3-70b-8192"
-GUIDELINE_FILE = "./data/drugs-Info.json"
-mapping_file = "./data/Mapped_diseases.json"
 INDEX_PATH = "./faiss_store"
 
-# ✅ Use HF Embeddings
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
-# ✅ Load FAISS index
-vectorstore = FAISS.load_local(INDEX_PATH, embedding_model)
 
+def _load_embedding_model():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
 
-def load_guideline_data() -> Dict[str, Dict[str, str]]:
-    try:
-        with open(GUIDELINE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        raise Exception(f"Failed to load guidelines: {e}")
+def _load_vectorstore():
+    import faiss
+    import pickle
+    from langchain_community.vectorstores import FAISS
 
-def mapped_disease():
+    # Memory-map the index where FAISS supports it (IVF lists, flat codes) so
+    # workers share the pages instead of each reading a private copy
+    index_file = os.path.join(INDEX_PATH, "index.faiss")
     try:
-        with open(mapping_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        raise Exception(f"Failed to load guidelines: {e}")
-    
-def mapped_drugs_list(disease):
-    drug_df = pd.read_csv("./data/cleaned_drug_disease.csv")
-    drugs_list = drug_df[drug_df['disease'] == disease]['drug'].unique().tolist()
-    return drugs_list
-    
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_file)
 
-async def query_llm(messages: List[Dict[str, str]]) -> str:
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": messages
-    }
-
-    async with httpx.AsyncClient() as client:
-        res = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        if res.status_code != 200:
-            raise Exception("Groq API failed: " + res.text)
-
-        return res.json()["choices"][0]["message"]["content"]
+    with open(os.path.join(INDEX_PATH, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(registry.get("embedding_model"), index, docstore, index_to_docstore_id)
 
+# ✅ HF Embeddings + FAISS index are loaded on first use (or during startup warm-up)
+registry.register("embedding_model", _load_embedding_model)
+registry.register("vectorstore", _load_vectorstore)
 
-async def chat_about_drug(
-    user: User,
-    message: str,
-    db: Session,
-    disease: Optional[str],
-    drug: Optional[str] = None,
-    suggested_drugs: Optional[List[str]] = None,
-    memory_limit: int = 10
-) -> Dict[str, str]:
 
+def load_guideline_data() -> Dict[str, Dict[str, str]]:
+    return drug_catalog.all_guidelines()
+
+def mapped_disease() -> Dict[str, str]:
+    return drug_catalog.all_disease_mappings()
+
+def mapped_drugs_list(disease) -> List[str]:
+    return drug_catalog.drugs_for_disease(disease)
+
+async def query_llm(messages: List[Dict[str, str]]) -> str:
+    return await llm_gateway.chat(messages, model=GROQ_MODEL)
+
+
+def greeting_reply(user: User, message: str, disease: Optional[str], suggested_drugs: Optional[List[str]]) -> Optional[Dict[str, str]]:
     user_name = user.full_name or "User"
     user_message = message.strip().lower()
 
@@ -92,26 +80,25 @@ async def chat_about_drug(
         return {
             "bot": f"Hello {user_short}! What would you like to know today?"
         }
+    return None
+
+
+def build_conversation(message: str, history: List[Dict[str, str]],
+                       query_vector=None, drug: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Assemble the LLM messages: guideline context, recent chat history and the new question.
+    `history` is the user's rolling summary and newest turns (conversation_memory.history).
+    `query_vector` reuses an already computed question embedding for the search, and
+    `drug` limits the guideline search to that drug's documents when it is indexed.
+    Questions that name a drug without a precomputed embedding are served by BM25 alone.
+    Context is cut to the conversation memory's token budget.
+    """
+    user_message = message.strip().lower()
+    conversation = list(history)
 
-
-    # ✅ Recent chat history (for memory)
-    chat_history = (
-        db.query(ChatLog)
-        .filter(ChatLog.user_id == user.id)
-        .order_by(ChatLog.timestamp.desc())
-        .limit(memory_limit)
-        .all()
-    )
-    chat_history.reverse()
-
-    conversation = []
-    for entry in chat_history:
-        conversation.append({"role": "user", "content": entry.user_message + f"drug: {entry.drug_name}"})
-        conversation.append({"role": "assistant", "content": entry.bot_response})
-
-    # ✅ Semantic search via FAISS
-    docs = vectorstore.similarity_search(user_message, k=5)
-    context = "\n\n".join([doc.page_content for doc in docs])
+    # ✅ Hybrid BM25 + FAISS search, scoped to the requested drug when possible
+    docs = registry.get("guideline_retriever").hybrid_search(user_message, k=5, drug=drug, query_vector=query_vector)
+    context = conversation_memory.context([doc.page_content for doc in docs])
 
     system_prompt = (
         "You are a helpful medical assistant.\n"
@@ -121,11 +108,35 @@ async def chat_about_drug(
 
     conversation.insert(0, {"role": "system", "content": system_prompt})
     conversation.append({"role": "user", "content": message})
+    return conversation
 
-    bot_reply = await query_llm(conversation)
 
+async def embed_question(message: str):
+    """
+    Question embedding for the semantic cache and guideline search, encoded
+    off the event loop. Questions naming a drug skip the embedding altogether:
+    only exact repeats are looked up in the cache and the context comes from BM25.
+    """
+    if registry.get("guideline_retriever").match_drug(message) is not None:
+        return None
+    return await embedding_service.embed(normalize_question(message))
+
+
+def resolve_drug_name(drug: Optional[str]) -> Optional[str]:
+    """
+    Catalog name for the drug the client picked, so a synonym or different
+    casing scopes the guideline search and the semantic cache like the real
+    name. Only exact and synonym matches are applied.
+    """
+    if not drug:
+        return drug
+    match = drug_resolver.exact(drug)
+    return match["canonical"] if match else drug
+
+
+def save_chat_log(db: Session, user_id: str, drug: Optional[str], message: str, bot_reply: str):
     log_entry = ChatLog(
-        user_id=user.id,
+        user_id=user_id,
         drug_name=drug,
         user_message=message,
         bot_response=bot_reply,
@@ -134,4 +145,90 @@ async def chat_about_drug(
     db.add(log_entry)
     db.commit()
 
-    return {"answer": bot_reply}
\ No newline at end of file
+
+async def chat_about_drug(
+    user: User,
+    message: str,
+    db: Session,
+    disease: Optional[str],
+    drug: Optional[str] = None,
+    suggested_drugs: Optional[List[str]] = None,
+    memory_limit: int = 10
+) -> Dict[str, str]:
+
+    greeting = greeting_reply(user, message, disease, suggested_drugs)
+    if greeting:
+        return greeting
+
+    start = time.perf_counter()
+    drug = resolve_drug_name(drug)
+    # ✅ Rolling summary + the newest turns that fit the history budget
+    history = await conversation_memory.history(user.id, memory_limit)
+    query_vector = await embed_question(message)
+    # Answers shaped by a user's history are neither shared nor reused
+    cacheable = not history
+    cached_reply = semantic_cache.lookup(message, drug, query_vector) if cacheable else None
+    if cached_reply is not None:
+        await asyncio.to_thread(save_chat_log, db, user.id, drug, message, cached_reply)
+        return {"answer": cached_reply}
+
+    conversation = build_conversation(message, history, query_vector=query_vector, drug=drug)
+    bot_reply = await query_llm(conversation)
+    await asyncio.to_thread(save_chat_log, db, user.id, drug, message, bot_reply)
+    conversation_memory.schedule_summary(user.id, memory_limit)
+    if cacheable:
+        semantic_cache.store(message, drug, bot_reply, query_vector, time.perf_counter() - start)
+
+    return {"answer": bot_reply}
+
+
+async def stream_chat_about_drug(
+    user: User,
+    message: str,
+    disease: Optional[str],
+    drug: Optional[str] = None,
+    suggested_drugs: Optional[List[str]] = None,
+    memory_limit: int = 10
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Streaming variant of chat_about_drug. Yields ("token", {"token": ...})
+    events as the LLM produces them and a final ("done", {...}) event with the
+    full reply. The ChatLog row is written once the stream has completed.
+    Uses its own DB session since it outlives the request's dependencies.
+    """
+    greeting = greeting_reply(user, message, disease, suggested_drugs)
+    if greeting:
+        yield "done", greeting
+        return
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        drug = resolve_drug_name(drug)
+        history = await conversation_memory.history(user.id, memory_limit)
+        query_vector = await embed_question(message)
+        # Answers shaped by a user's history are neither shared nor reused
+        cacheable = not history
+        cached_reply = semantic_cache.lookup(message, drug, query_vector) if cacheable else None
+        if cached_reply is not None:
+            await asyncio.to_thread(save_chat_log, db, user.id, drug, message, cached_reply)
+            yield "token", {"token": cached_reply}
+            yield "done", {"answer": cached_reply}
+            return
+
+        conversation = build_conversation(message, history, query_vector=query_vector, drug=drug)
+
+        parts = []
+        async for token in llm_gateway.stream_chat(conversation, model=GROQ_MODEL):
+            parts.append(token)
+            yield "token", {"token": token}
+
+        bot_reply = "".join(parts)
+        await asyncio.to_thread(save_chat_log, db, user.id, drug, message, bot_reply)
+        conversation_memory.schedule_summary(user.id, memory_limit)
+        if cacheable:
+            semantic_cache.store(message, drug, bot_reply, query_vector, time.perf_counter() - start)
+    finally:
+        db.close()
+
+    yield "done", {"answer": bot_reply}
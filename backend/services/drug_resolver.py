@@ -0,0 +1,235 @@
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from services.drug_catalog import drug_catalog
+
+logger = logging.getLogger("drug_resolver")
+
+# International names that the catalog lists under their US name
+DRUG_SYNONYMS = {
+    "paracetamol": "acetaminophen",
+    "salbutamol": "albuterol",
+    "adrenaline": "epinephrine",
+    "noradrenaline": "norepinephrine",
+    "frusemide": "furosemide",
+    "lignocaine": "lidocaine",
+    "glyceryl trinitrate": "nitroglycerin",
+    "amoxycillin": "amoxicillin",
+}
+RESOLVE_LIMIT = 5
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    return NON_ALNUM.sub(" ", name.lower()).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"${text}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def max_edits(length: int) -> int:
+    """
+    Typos tolerated for a name of `length` characters.
+    """
+    if length < 4:
+        return 0
+    if length < 7:
+        return 1
+    if length < 12:
+        return 2
+    return 3
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Edit distance between `a` and `b`, or None as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class DrugResolver:
+    """
+    Fuzzy lookup of drug names (catalog names plus common synonyms) for OCR
+    output and chat questions. Names are indexed by character trigram; a
+    query only verifies names that share enough trigrams to be within
+    `max_edits` of it (each edit breaks at most three trigrams on either
+    side) and of similar length, with an edit distance that stops early.
+    Rebuilt when the drug catalog reloads.
+    """
+
+    def __init__(self, catalog=drug_catalog, synonyms: Dict[str, str] = DRUG_SYNONYMS):
+        self.catalog = catalog
+        self.synonyms = synonyms
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys: List[str] = []
+        self._names: List[str] = []
+        self._canonical: List[str] = []
+        self._by_key: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        self.max_name_words = 0
+
+        self.lookups = 0
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+
+    def _ensure_loaded(self):
+        self.catalog.all_guidelines()  # cheap freshness check; reloads the catalog if its files changed
+        if self._version == self.catalog.reloads:
+            return
+        with self._lock:
+            if self._version == self.catalog.reloads:
+                return
+            entries = {}
+            for name in self.catalog.all_drug_names():
+                entries.setdefault(normalize(name), (name, name))
+            for synonym, target in self.synonyms.items():
+                if normalize(target) in entries:
+                    entries.setdefault(normalize(synonym), (synonym, entries[normalize(target)][1]))
+            entries.pop("", None)
+
+            keys = list(entries)
+            postings: Dict[str, List[int]] = {}
+            gram_counts = []
+            for i, key in enumerate(keys):
+                grams = set(trigrams(key))
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(i)
+
+            self._keys = keys
+            self._names = [entries[key][0] for key in keys]
+            self._canonical = [entries[key][1] for key in keys]
+            self._by_key = {key: i for i, key in enumerate(keys)}
+            self._postings = postings
+            self._gram_counts = gram_counts
+            self.max_name_words = max((len(key.split()) for key in keys), default=0)
+            self._version = self.catalog.reloads
+            logger.info(f"Indexed {len(keys)} drug names, {len(postings)} trigrams")
+
+    def _match(self, i: int, distance: int, key: str) -> dict:
+        return {
+            "name": self._names[i],
+            "canonical": self._canonical[i],
+            "distance": distance,
+            "score": round(1 - distance / max(len(key), len(self._keys[i])), 3),
+        }
+
+    def _lookup(self, key: str, limit: int, fuzzy: bool = True) -> List[dict]:
+        if key in self._by_key:
+            return [self._match(self._by_key[key], 0, key)]
+        edits = max_edits(len(key)) if fuzzy else 0
+        if edits == 0:
+            return []
+
+        grams = set(trigrams(key))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        matches = []
+        for i, count in shared.items():
+            # Both strings keep all but at most 3 * edits of their trigrams
+            if count < max(1, len(grams), self._gram_counts[i]) - 3 * edits:
+                continue
+            if abs(len(key) - len(self._keys[i])) > edits:
+                continue
+            distance = bounded_levenshtein(key, self._keys[i], edits)
+            if distance is not None:
+                matches.append(self._match(i, distance, key))
+        matches.sort(key=lambda m: (m["distance"], -m["score"], m["name"]))
+        return matches[:limit]
+
+    def _record(self, matches: List[dict], start: float):
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        if not matches:
+            self.misses += 1
+        elif matches[0]["distance"] == 0:
+            self.exact_hits += 1
+        else:
+            self.fuzzy_hits += 1
+
+    def resolve(self, query: str, limit: int = RESOLVE_LIMIT) -> List[dict]:
+        """
+        Closest drug names to `query`, best first: an exact (case- and
+        punctuation-insensitive) match alone, else names within `max_edits`.
+        """
+        start = time.perf_counter()
+        self._ensure_loaded()
+        key = normalize(query)
+        matches = self._lookup(key, limit) if key else []
+        self._record(matches, start)
+        return matches
+
+    def best(self, query: str) -> Optional[dict]:
+        matches = self.resolve(query, limit=1)
+        return matches[0] if matches else None
+
+    def exact(self, query: str) -> Optional[dict]:
+        """
+        The catalog entry `query` names exactly or as a synonym. Fuzzy
+        matches are only suggestions: a correctly spelled drug that isn't in
+        the catalog (vildagliptin) is often a typo away from one that is
+        (sitagliptin), so they must never replace a name on their own.
+        """
+        start = time.perf_counter()
+        self._ensure_loaded()
+        key = normalize(query)
+        matches = self._lookup(key, 1, fuzzy=False) if key else []
+        self._record(matches, start)
+        return matches[0] if matches else None
+
+    def find(self, text: str) -> Optional[dict]:
+        """
+        The longest drug name mentioned word-for-word (or as a synonym) in
+        free text. No typo tolerance here: ordinary words are often a typo
+        away from a drug (hepatic/heparin, protein/protein c).
+        """
+        start = time.perf_counter()
+        self._ensure_loaded()
+        words = normalize(text).split()
+        match = None
+        for size in range(min(self.max_name_words, len(words)), 0, -1):
+            for i in range(len(words) - size + 1):
+                found = self._lookup(" ".join(words[i:i + size]), 1, fuzzy=False)
+                if found:
+                    match = found[0]
+                    break
+            if match:
+                break
+        self._record([match] if match else [], start)
+        return match
+
+    def stats(self) -> dict:
+        return {
+            "names": len(self._keys),
+            "trigrams": len(self._postings),
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "avg_lookup_us": round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else 0.0,
+        }
+
+
+drug_resolver = DrugResolver()
@@ -0,0 +1,70 @@
+import os
+import asyncio
+import logging
+import numpy as np
+from typing import Callable, List
+
+from services.model_registry import registry
+from services.micro_batcher import MicroBatcher
+
+logger = logging.getLogger("embedding_service")
+
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "3"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    return np.asarray(registry.get("embedding_model").embed_documents(texts), dtype=np.float32)
+
+
+class EmbeddingService:
+    """
+    Awaitable sentence-transformer encoding. Concurrent `embed` calls are
+    queued and encoded together in one forward pass, flushed when
+    `max_batch_size` texts are waiting or the oldest has waited
+    `max_wait_ms` (see services.micro_batcher). Encoding runs on a dedicated
+    pool of `workers` threads (torch releases the GIL), so the event loop
+    keeps serving other requests meanwhile.
+    """
+
+    def __init__(self,
+                 embed_fn: Callable[[List[str]], np.ndarray] = embed_texts,
+                 max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+                 workers: int = EMBEDDING_WORKERS):
+        self.embed_fn = embed_fn
+        self.workers = max(1, workers)
+        self.batcher = MicroBatcher("embedding", self._embed_batch, max_batch_size, max_wait_ms, workers=self.workers)
+        self._texts_encoded = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        return await self.batcher.submit(text)
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        vectors = await asyncio.gather(*(self.embed(text) for text in texts))
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        # Identical questions in one batch are encoded once
+        unique = list(dict.fromkeys(texts))
+        by_text = dict(zip(unique, self.embed_fn(unique)))
+        self._texts_encoded += len(unique)
+        return [by_text[text] for text in texts]
+
+    def stats(self) -> dict:
+        stats = self.batcher.stats()
+        batches = stats["batches"]
+        stats.update({
+            "workers": self.workers,
+            "texts_encoded": self._texts_encoded,
+            "avg_batch_size": round(self._texts_encoded / batches, 2) if batches else 0.0,
+            "avg_encode_ms": stats.pop("avg_batch_ms"),
+        })
+        return stats
+
+    async def shutdown(self):
+        await self.batcher.shutdown()
+
+
+embedding_service = EmbeddingService()
@@ -0,0 +1,151 @@
+import numpy as np
+from typing import List, Dict, Iterable, Optional
+
+NON_SYMPTOM_COLS = [
+    'gender_enc', 'smoking_enc', 'alcohol_enc',
+    'age_scaled', 'height_scaled', 'weight_scaled'
+]
+
+
+class SparseRows:
+    """
+    CSR-style batch of encoded rows: the nonzero columns of row i are
+    indices[indptr[i]:indptr[i + 1]] with the matching entries of values.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray, n_features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.n_features = n_features
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def concat(cls, batches: List["SparseRows"]) -> "SparseRows":
+        counts = np.concatenate([np.diff(b.indptr) for b in batches])
+        return cls(
+            indptr=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            indices=np.concatenate([b.indices for b in batches]),
+            values=np.concatenate([b.values for b in batches]),
+            n_features=batches[0].n_features,
+        )
+
+    def to_dense(self) -> np.ndarray:
+        out = np.zeros((len(self), self.n_features), dtype=np.float32)
+        row_ids = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        out[row_ids, self.indices] = self.values
+        return out
+
+    def key_bytes(self) -> bytes:
+        return self.indptr.tobytes() + self.indices.tobytes() + self.values.tobytes()
+
+
+class FeatureEncoder:
+    """
+    Precompiled version of the model input encoding. Column positions,
+    label-encoder codes and scaler statistics are resolved once so rows can
+    be written straight into a float32 array without pandas or sklearn calls.
+    """
+
+    def __init__(self, input_columns: List[str], le_gender, le_smoking, le_alcohol, scaler):
+        self.input_columns = list(input_columns)
+        self.n_features = len(self.input_columns)
+
+        column_index = {col: i for i, col in enumerate(self.input_columns)}
+        self.symptom_index: Dict[str, int] = {
+            col: i for col, i in column_index.items() if col not in NON_SYMPTOM_COLS
+        }
+
+        self.gender_col = column_index['gender_enc']
+        self.smoking_col = column_index['smoking_enc']
+        self.alcohol_col = column_index['alcohol_enc']
+        self.numeric_cols = np.array([
+            column_index['age_scaled'],
+            column_index['height_scaled'],
+            column_index['weight_scaled'],
+        ])
+
+        # LabelEncoder codes are the positions in classes_; unknown values fall back to classes_[0]
+        self.gender_codes = {cls: float(code) for code, cls in enumerate(le_gender.classes_)}
+        self.smoking_codes = {cls: float(code) for code, cls in enumerate(le_smoking.classes_)}
+        self.alcohol_codes = {cls: float(code) for code, cls in enumerate(le_alcohol.classes_)}
+
+        n_numeric = len(self.numeric_cols)
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        self.scaler_mean = np.asarray(mean, dtype=np.float64) if mean is not None else np.zeros(n_numeric)
+        self.scaler_scale = np.asarray(scale, dtype=np.float64) if scale is not None else np.ones(n_numeric)
+
+    def symptom_indices(self, symptom_list: Iterable[str]) -> List[int]:
+        return [self.symptom_index[s] for s in symptom_list if s in self.symptom_index]
+
+    def _demographics(self, gender, smoking, alcohol, age, height_cm, weight_kg):
+        numeric = np.array([age, height_cm, weight_kg], dtype=np.float64)
+        if not np.isfinite(numeric).all():
+            raise ValueError("Input contains NaN: age, height_cm and weight_kg are required")
+
+        codes = [
+            self.gender_codes.get(gender, 0.0) if gender else 0.0,
+            self.smoking_codes.get(smoking, 0.0) if smoking else 0.0,
+            self.alcohol_codes.get(alcohol, 0.0) if alcohol else 0.0,
+        ]
+        return codes, (numeric - self.scaler_mean) / self.scaler_scale
+
+    def encode_into(self,
+                    out_row: np.ndarray,
+                    symptom_list: Iterable[str],
+                    gender: Optional[str],
+                    smoking: Optional[str],
+                    alcohol: Optional[str],
+                    age: int,
+                    height_cm: float,
+                    weight_kg: float) -> np.ndarray:
+        """
+        Encode one profile into a preallocated (n_features,) row.
+        """
+        codes, scaled = self._demographics(gender, smoking, alcohol, age, height_cm, weight_kg)
+
+        out_row[:] = 0
+        out_row[self.symptom_indices(symptom_list)] = 1
+        out_row[[self.gender_col, self.smoking_col, self.alcohol_col]] = codes
+        out_row[self.numeric_cols] = scaled
+        return out_row
+
+    def encode(self, symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg) -> np.ndarray:
+        """
+        Encode one profile as a (1, n_features) float32 array.
+        """
+        row = np.zeros((1, self.n_features), dtype=np.float32)
+        self.encode_into(row[0], symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg)
+        return row
+
+    def encode_sparse(self, symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg) -> SparseRows:
+        """
+        Encode one profile as a single CSR row: the sorted, de-duplicated
+        symptom columns followed by the six demographic columns.
+        """
+        codes, scaled = self._demographics(gender, smoking, alcohol, age, height_cm, weight_kg)
+        symptoms = sorted(set(self.symptom_indices(symptom_list)))
+
+        indices = np.array(
+            symptoms + [self.gender_col, self.smoking_col, self.alcohol_col] + self.numeric_cols.tolist(),
+            dtype=np.int32,
+        )
+        values = np.concatenate([np.ones(len(symptoms)), codes, scaled]).astype(np.float32)
+        return SparseRows(np.array([0, len(indices)], dtype=np.int64), indices, values, self.n_features)
+
+    def encode_sparse_batch(self, profiles: List[dict]) -> SparseRows:
+        return SparseRows.concat([self.encode_sparse(**profile) for profile in profiles])
+
+    def encode_batch(self, profiles: List[dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode many profiles into a (len(profiles), n_features) float32 matrix.
+        Each profile is a dict with the keyword arguments of `encode`.
+        """
+        if out is None:
+            out = np.zeros((len(profiles), self.n_features), dtype=np.float32)
+        for i, profile in enumerate(profiles):
+            self.encode_into(out[i], **profile)
+        return out
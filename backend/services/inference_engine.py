@@ -0,0 +1,58 @@
+import os
+import logging
+import numpy as np
+from typing import Callable, List, Tuple, Any
+
+from services.feature_encoder import SparseRows
+from services.micro_batcher import MicroBatcher
+from services.prediction import predict_batch
+
+logger = logging.getLogger("inference_engine")
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+
+class InferenceEngine:
+    """
+    Queues concurrent prediction requests and scores them with one batched
+    model call. A batch is flushed when it holds `max_batch_size` rows or
+    when the first queued request has waited `max_wait_ms` (see
+    services.micro_batcher).
+    """
+
+    def __init__(self,
+                 predict_fn: Callable[[np.ndarray], List[Any]],
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.batcher = MicroBatcher("inference", self._predict_rows, max_batch_size, max_wait_ms)
+
+    async def predict(self, input_row) -> Tuple[str, float, List[Tuple[str, float]]]:
+        """
+        Queue one prepared input row (dense or a single SparseRows row) and
+        wait for its own top-k result.
+        """
+        row = input_row if isinstance(input_row, SparseRows) else np.asarray(input_row, dtype=np.float32).reshape(-1)
+        return await self.batcher.submit(row)
+
+    def _predict_rows(self, rows) -> List[Any]:
+        # A malformed row fails its batch here instead of killing the worker
+        return self.predict_fn(self._stack(rows))
+
+    @staticmethod
+    def _stack(rows):
+        if all(isinstance(row, SparseRows) for row in rows):
+            return SparseRows.concat(rows)
+        return np.stack([row.to_dense()[0] if isinstance(row, SparseRows) else row for row in rows])
+
+    def stats(self) -> dict:
+        stats = self.batcher.stats()
+        stats["avg_inference_ms"] = stats.pop("avg_batch_ms")
+        return stats
+
+    async def shutdown(self):
+        await self.batcher.shutdown()
+
+
+engine = InferenceEngine(predict_batch)
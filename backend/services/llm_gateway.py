@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import importlib.util
+from collections import deque
+from typing import List, Dict, Optional, AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("llm_gateway")
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+# Point at a local stub server in tests, e.g. http://127.0.0.1:8081/openai/v1/chat/completions
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMGateway:
+    """
+    One long-lived, pooled HTTP client for the chat-completions API.
+    Keeps connections alive between calls, caps concurrent upstream requests
+    with a semaphore, retries 429/5xx and transport errors with jittered
+    exponential backoff, and records per-call latency.
+    """
+
+    def __init__(self,
+                 api_url: str = GROQ_API_URL,
+                 api_key: Optional[str] = GROQ_API_KEY,
+                 model: str = GROQ_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES,
+                 backoff_seconds: float = LLM_BACKOFF_SECONDS,
+                 timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+                 http2: bool = LLM_HTTP2):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        # HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._calls = 0
+        self._errors = 0
+        self._retries = 0
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1000)
+        self._first_token_latencies = deque(maxlen=1000)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def start(self):
+        self._get_client()
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    async def post(self, payload: dict) -> dict:
+        """
+        POST a chat-completions payload and return the decoded JSON body.
+        """
+        client = self._get_client()
+        async with self._semaphore:
+            self._in_flight += 1
+            start = time.perf_counter()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        res = await client.post(self.api_url, json=payload)
+                    except httpx.TransportError as e:
+                        if attempt >= self.max_retries:
+                            raise Exception(f"Groq API failed: {e}")
+                        self._retries += 1
+                        await asyncio.sleep(self._backoff(attempt))
+                        continue
+
+                    if res.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        self._retries += 1
+                        logger.info(f"LLM call got {res.status_code}, retrying (attempt {attempt + 1})")
+                        await asyncio.sleep(self._backoff(attempt, res))
+                        continue
+                    if res.status_code != 200:
+                        raise Exception("Groq API failed: " + res.text)
+                    return res.json()
+            except Exception:
+                self._errors += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                self._calls += 1
+                self._latencies.append(time.perf_counter() - start)
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> str:
+        payload = {"model": model or self.model, "messages": messages, **params}
+        data = await self.post(payload)
+        return data["choices"][0]["message"]["content"]
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> AsyncIterator[str]:
+        """
+        Stream a completion and yield content deltas as the upstream sends
+        them (OpenAI-style SSE). Retries only happen before the first token.
+        """
+        client = self._get_client()
+        payload = {"model": model or self.model, "messages": messages, "stream": True, **params}
+        async with self._semaphore:
+            self._in_flight += 1
+            start = time.perf_counter()
+            first_token = True
+            try:
+                for attempt in range(self.max_retries + 1):
+                    retry_delay = None
+                    try:
+                        async with client.stream("POST", self.api_url, json=payload) as res:
+                            if res.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                                await res.aread()
+                                retry_delay = self._backoff(attempt, res)
+                            elif res.status_code != 200:
+                                body = await res.aread()
+                                raise Exception("Groq API failed: " + body.decode("utf-8", errors="replace"))
+                            else:
+                                async for line in res.aiter_lines():
+                                    if not line.startswith("data:"):
+                                        continue
+                                    data = line[len("data:"):].strip()
+                                    if data == "[DONE]":
+                                        break
+                                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                                    if delta:
+                                        if first_token:
+                                            first_token = False
+                                            self._first_token_latencies.append(time.perf_counter() - start)
+                                        yield delta
+                                return
+                    except httpx.TransportError as e:
+                        if not first_token or attempt >= self.max_retries:
+                            raise Exception(f"Groq API failed: {e}")
+                        retry_delay = self._backoff(attempt)
+
+                    self._retries += 1
+                    logger.info(f"LLM stream failed before first token, retrying (attempt {attempt + 1})")
+                    await asyncio.sleep(retry_delay)
+            except Exception:
+                self._errors += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                self._calls += 1
+                self._latencies.append(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        def percentiles(samples):
+            samples = sorted(samples)
+
+            def percentile(p):
+                if not samples:
+                    return None
+                return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+            return {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)}
+
+        return {
+            "calls": self._calls,
+            "errors": self._errors,
+            "retries": self._retries,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "http2": self.http2,
+            "latency_ms": percentiles(self._latencies),
+            "stream_first_token_ms": percentiles(self._first_token_latencies),
+        }
+
+
+llm_gateway = LLMGateway()
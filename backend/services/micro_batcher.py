@@ -0,0 +1,143 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger("micro_batcher")
+
+
+class MicroBatcher:
+    """
+    Collects concurrent awaitable requests into batches for one call of
+    `batch_fn`, which takes the queued items and returns one result per
+    item, in order. A batch is flushed when it holds `max_batch_size` items
+    or when the first queued item has waited `max_wait_ms`.
+
+    `batch_fn` runs off the event loop: on the loop's default executor, or
+    on a private pool of `workers` threads that also bounds how many
+    batches run at once (one at a time without it). A failing batch only
+    fails its own requests; the worker keeps going.
+    """
+
+    def __init__(self,
+                 name: str,
+                 batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int,
+                 max_wait_ms: float,
+                 workers: Optional[int] = None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.workers = max(1, workers) if workers else None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Bounds the number of batches running at once
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_seconds = 0.0
+        self.batch_sizes = Counter()
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers or 1)
+            if self.workers and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item) -> Any:
+        """
+        Queue one item and wait for its own result.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = self._loop.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _flush(self, batch):
+        try:
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                return
+
+            start = time.perf_counter()
+            try:
+                results = await self._loop.run_in_executor(self._executor, self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Batched {self.name} failed for {len(batch)} request(s): {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                self.batch_seconds += time.perf_counter() - start
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "avg_batch_ms": round(self.batch_seconds * 1000 / max(self.batches + self.errors, 1), 3),
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+    async def shutdown(self):
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
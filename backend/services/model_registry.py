@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("model_registry")
+logger.setLevel(logging.INFO)
+
+
+class ModelRegistry:
+    """
+    Loads ML artifacts on first use instead of at import time.
+
+    Services register a loader per artifact name; `get` runs the loader once
+    (thread-safe) and hands out the same read-only object afterwards.
+    `warm_up` loads everything up front, e.g. from a background task at
+    startup or in a pre-fork master process so workers share the pages.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._artifacts: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+        self._status.setdefault(name, {"state": "pending"})
+
+    def get(self, name: str) -> Any:
+        if name in self._artifacts:
+            return self._artifacts[name]
+        if name not in self._loaders:
+            raise KeyError(f"No artifact registered under '{name}'")
+
+        with self._locks[name]:
+            if name in self._artifacts:
+                return self._artifacts[name]
+
+            self._status[name] = {"state": "loading"}
+            start = time.perf_counter()
+            try:
+                artifact = self._loaders[name]()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "error": str(e)}
+                logger.warning(f"Failed to load artifact '{name}': {e}")
+                raise
+            elapsed = time.perf_counter() - start
+            self._artifacts[name] = artifact
+            self._status[name] = {"state": "ready", "load_seconds": round(elapsed, 3)}
+            logger.info(f"Loaded artifact '{name}' in {elapsed:.2f}s")
+            return artifact
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._artifacts
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """
+        Load the given artifacts (all registered ones by default). Failures are
+        recorded in the status and do not stop the remaining loads.
+        """
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def reset(self, name: str):
+        """
+        Drop a loaded artifact so the next `get` reloads it.
+        """
+        with self._locks[name]:
+            self._artifacts.pop(name, None)
+            self._status[name] = {"state": "pending"}
+
+    def ready(self) -> bool:
+        return all(status["state"] == "ready" for status in self._status.values())
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready(),
+            "artifacts": {name: dict(status) for name, status in self._status.items()},
+        }
+
+
+registry = ModelRegistry()
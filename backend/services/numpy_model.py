@@ -0,0 +1,80 @@
+import json
+import numpy as np
+from typing import List
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    shifted = x - x.max(axis=-1, keepdims=True)
+    np.exp(shifted, out=shifted)
+    shifted /= shifted.sum(axis=-1, keepdims=True)
+    return shifted
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    "softmax": _softmax,
+}
+
+
+class NumpyMLP:
+    """
+    Pure-NumPy evaluator for the dense disease model exported by
+    scripts/export_model.py. `predict` mirrors the Keras signature so it can
+    stand in for the Keras model without changes to the callers.
+    """
+
+    def __init__(self, layers: List[dict]):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data["spec"]))
+            layers = []
+            for i, layer in enumerate(spec):
+                if layer["type"] == "dense":
+                    layer["kernel"] = np.ascontiguousarray(data[f"kernel_{i}"], dtype=np.float32)
+                    layer["bias"] = np.ascontiguousarray(data[f"bias_{i}"], dtype=np.float32)
+                elif layer["type"] == "affine":
+                    layer["scale"] = np.ascontiguousarray(data[f"scale_{i}"], dtype=np.float32)
+                    layer["shift"] = np.ascontiguousarray(data[f"shift_{i}"], dtype=np.float32)
+                if layer.get("activation", "linear") not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation '{layer['activation']}' in layer {i}")
+                layers.append(layer)
+        return cls(layers)
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        out = np.array(x, dtype=np.float32)
+        if out.ndim == 1:
+            out = out.reshape(1, -1)
+        return self._forward(out, self.layers)
+
+    def predict_sparse(self, rows) -> np.ndarray:
+        """
+        Score CSR rows (see services.feature_encoder.SparseRows). The first
+        dense layer only gathers the kernel rows of the nonzero columns
+        instead of multiplying by a mostly-zero input matrix.
+        """
+        first = self.layers[0]
+        if first["type"] != "dense" or (np.diff(rows.indptr) == 0).any():
+            return self.predict(rows.to_dense())
+
+        contrib = first["kernel"][rows.indices] * rows.values[:, None]
+        out = np.add.reduceat(contrib, rows.indptr[:-1], axis=0)
+        out += first["bias"]
+        out = ACTIVATIONS[first.get("activation", "linear")](out)
+        return self._forward(out, self.layers[1:])
+
+    def _forward(self, out: np.ndarray, layers: List[dict]) -> np.ndarray:
+        for layer in layers:
+            if layer["type"] == "dense":
+                out = out @ layer["kernel"]
+                out += layer["bias"]
+            elif layer["type"] == "affine":
+                out = out * layer["scale"]
+                out += layer["shift"]
+            out = ACTIVATIONS[layer.get("activation", "linear")](out)
+        return out
@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from utils.ocr import ocr_image_task, pdf_page_task, pdf_page_count_task
+
+logger = logging.getLogger("ocr_pool")
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+PAGE_TIMING_WINDOW = 1000
+
+
+@dataclass
+class OCRResult:
+    text: str
+    pages: List[dict] = field(default_factory=list)  # [{"page", "ms", "chars", "method", "quality"}]
+    total_ms: float = 0.0
+
+    def timings(self) -> dict:
+        return {"pages": self.pages, "total_ms": round(self.total_ms, 1)}
+
+
+class OCRPool:
+    """
+    Runs tesseract in a pool of worker processes so OCR never blocks the
+    event loop and PDF pages are recognised in parallel (one task per
+    page). Tasks get the stored file's path and rasterize a single page
+    each, so memory per worker is bounded by one page however long the
+    document is. PDF pages that carry a usable text layer (digitally
+    generated e-prescriptions) are read directly and skip tesseract; the
+    path each page took is recorded in its timings. Workers are spawned rather than forked, so they don't
+    inherit the app's threads or loaded models.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.documents = 0
+        self.pages = 0
+        self.text_layer_pages = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._page_ms = {"ocr": deque(maxlen=PAGE_TIMING_WINDOW),
+                         "text_layer": deque(maxlen=PAGE_TIMING_WINDOW)}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+
+    async def extract_text(self, file_path: str, file_ext: str) -> OCRResult:
+        """
+        OCR a stored image or PDF once; the result is shared by everything
+        downstream (the stored prescription text and the medication parser).
+        """
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            if file_ext.lower().lstrip(".") == "pdf":
+                page_count = await self._run(pdf_page_count_task, file_path)
+                results = await asyncio.gather(*(
+                    self._run(pdf_page_task, file_path, page) for page in range(1, page_count + 1)
+                ))
+            else:
+                results = [await self._run(ocr_image_task, file_path)]
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        pages = []
+        for number, (text, ms, method, quality) in enumerate(results, start=1):
+            pages.append({"page": number, "ms": round(ms, 1), "chars": len(text),
+                          "method": method, "quality": quality})
+            if method == "text_layer":
+                self.text_layer_pages += 1
+            self._page_ms[method].append(ms)
+        self.documents += 1
+        self.pages += len(pages)
+
+        return OCRResult(
+            text="\n\n".join(result[0] for result in results),
+            pages=pages,
+            total_ms=(time.perf_counter() - start) * 1000,
+        )
+
+    def stats(self) -> dict:
+        stats = {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "documents": self.documents,
+            "pages": self.pages,
+            "text_layer_pages": self.text_layer_pages,
+            "ocr_pages": self.pages - self.text_layer_pages,
+            "text_layer_rate": round(self.text_layer_pages / self.pages, 4) if self.pages else 0.0,
+            "errors": self.errors,
+            "avg_pages_per_document": round(self.pages / self.documents, 2) if self.documents else 0.0,
+        }
+        for method, window in self._page_ms.items():
+            timings = np.asarray(window, dtype=np.float64)
+            stats[f"{method}_page_ms_p50"] = round(float(np.percentile(timings, 50)), 1) if timings.size else None
+            stats[f"{method}_page_ms_p95"] = round(float(np.percentile(timings, 95)), 1) if timings.size else None
+            stats[f"{method}_page_ms_max"] = round(float(timings.max()), 1) if timings.size else None
+        return stats
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ocr_pool = OCRPool()
@@ -1,21 +1,68 @@
+import os
 import numpy as np
-import pandas as pd
 import joblib
 from typing import List, Tuple
-from keras.models import load_model
 
-model = load_model("./data/Model Artifacts/disease_model.keras")
-label_encoder = joblib.load("./data/Model Artifacts/Saved Assets/label_encoder.pkl")
-le_gender = joblib.load("./data/Model Artifacts/Saved Assets/le_gender.pkl")
-le_smoking = joblib.load("./data/Model Artifacts/Saved Assets/le_smoking.pkl")
-le_alcohol = joblib.load("./data/Model Artifacts/Saved Assets/le_alcohol.pkl")
-scaler = joblib.load("./data/Model Artifacts/Saved Assets/scaler.pkl")
+from services.feature_encoder import FeatureEncoder, SparseRows, NON_SYMPTOM_COLS
+from services.model_registry import registry
 
-input_columns = joblib.load("./data/Model Artifacts/Saved Assets/input_columns.pkl")
-non_symptom_cols = [
-    'gender_enc', 'smoking_enc', 'alcohol_enc',
-    'age_scaled', 'height_scaled', 'weight_scaled'
-]
+MODEL_PATH = "./data/Model Artifacts/disease_model.keras"
+NUMPY_MODEL_PATH = "./data/Model Artifacts/disease_model.npz"
+
+# "keras", "numpy", or "auto" (NumPy export when present, Keras otherwise)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "auto").lower()
+TOP_K = int(os.getenv("PREDICTION_TOP_K", "3"))
+ASSETS_DIR = "./data/Model Artifacts/Saved Assets"
+
+non_symptom_cols = NON_SYMPTOM_COLS
+
+
+def _load_asset(file_name: str):
+    # mmap_mode shares numpy buffers through the page cache across worker processes
+    return lambda: joblib.load(f"{ASSETS_DIR}/{file_name}", mmap_mode="r")
+
+def _load_disease_model():
+    if MODEL_BACKEND == "numpy" or (MODEL_BACKEND == "auto" and os.path.exists(NUMPY_MODEL_PATH)):
+        from services.numpy_model import NumpyMLP
+        return NumpyMLP.load(NUMPY_MODEL_PATH)
+
+    from keras.models import load_model
+    return load_model(MODEL_PATH)
+
+def _build_encoder():
+    return FeatureEncoder(
+        registry.get("input_columns"),
+        registry.get("le_gender"),
+        registry.get("le_smoking"),
+        registry.get("le_alcohol"),
+        registry.get("scaler"),
+    )
+
+registry.register("label_encoder", _load_asset("label_encoder.pkl"))
+registry.register("le_gender", _load_asset("le_gender.pkl"))
+registry.register("le_smoking", _load_asset("le_smoking.pkl"))
+registry.register("le_alcohol", _load_asset("le_alcohol.pkl"))
+registry.register("scaler", _load_asset("scaler.pkl"))
+registry.register("input_columns", _load_asset("input_columns.pkl"))
+registry.register("feature_encoder", _build_encoder)
+# index -> disease name, replaces label_encoder.inverse_transform on the request path
+registry.register("disease_labels", lambda: np.asarray(registry.get("label_encoder").classes_))
+registry.register("disease_model", _load_disease_model)
+
+
+def get_encoder() -> FeatureEncoder:
+    return registry.get("feature_encoder")
+
+def prepare_gender_input(gender: str) -> str:
+    """
+    Map the gender stored on the user profile to the label the model was trained on.
+    """
+    if gender == "male":
+        return "M"
+    elif gender == "female":
+        return "F"
+    else:
+        return "Any"
 
 def prepare_model_input(symptom_list: List[str], 
                          gender: str,
@@ -23,50 +70,64 @@ def prepare_model_input(symptom_list: List[str],
                          alcohol: str,
                          age: int,
                          height_cm: float,
-                         weight_kg: float) -> pd.DataFrame:
+                         weight_kg: float) -> np.ndarray:
     """
     Prepare model input from selected symptoms and user demographics.
+    Returns a (1, n_features) float32 row.
     """
-    inputs = {col: 0 for col in input_columns if col not in non_symptom_cols}
+    return get_encoder().encode(symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg)
 
-    for symptom in symptom_list:
-        if symptom in inputs:
-            inputs[symptom] = 1
+def prepare_sparse_input(symptom_list: List[str],
+                         gender: str,
+                         smoking: str,
+                         alcohol: str,
+                         age: int,
+                         height_cm: float,
+                         weight_kg: float) -> SparseRows:
+    """
+    Same as prepare_model_input, but returns the row as symptom/demographic
+    column indices and values instead of a dense array.
+    """
+    return get_encoder().encode_sparse(symptom_list, gender, smoking, alcohol, age, height_cm, weight_kg)
 
-    if gender and gender in le_gender.classes_:
-        inputs['gender_enc'] = le_gender.transform([gender])[0]
-    else:
-        inputs['gender_enc'] = le_gender.transform([le_gender.classes_[0]])[0]
- 
-    # Handle missing or unknown smoking
-    if smoking and smoking in le_smoking.classes_:
-        inputs['smoking_enc'] = le_smoking.transform([smoking])[0]
-    else:
-        inputs['smoking_enc'] = le_smoking.transform([le_smoking.classes_[0]])[0]
+def top_k(predicted_probs: np.ndarray, k: int = TOP_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices and probabilities of the k most likely classes per row, in
+    descending order. argpartition keeps this O(n_classes) per row.
+    """
+    k = min(k, predicted_probs.shape[1])
+    candidates = np.argpartition(predicted_probs, -k, axis=1)[:, -k:]
+    candidate_probs = np.take_along_axis(predicted_probs, candidates, axis=1)
+    order = np.argsort(-candidate_probs, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_probs, order, axis=1)
 
-    # Handle missing or unknown alcohol
-    if alcohol and alcohol in le_alcohol.classes_:
-       inputs['alcohol_enc'] = le_alcohol.transform([alcohol])[0]
-    else:
-        inputs['alcohol_enc'] = le_alcohol.transform([le_alcohol.classes_[0]])[0]
-    
-    scaled_values = scaler.transform([[age, height_cm, weight_kg]])
-    inputs['age_scaled'] = scaled_values[0][0]
-    inputs['height_scaled'] = scaled_values[0][1]
-    inputs['weight_scaled'] = scaled_values[0][2]
+def predict_batch(inputs, k: int = TOP_K) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
+    """
+    Score a batch of prepared inputs (dense rows or SparseRows) with a single
+    model call and return the top-k result for each row.
+    """
+    model = registry.get("disease_model")
+    labels = registry.get("disease_labels")
 
-    return pd.DataFrame([inputs])
+    if isinstance(inputs, SparseRows):
+        if hasattr(model, "predict_sparse"):
+            predicted_probs = model.predict_sparse(inputs)
+        else:
+            predicted_probs = model.predict(inputs.to_dense(), verbose=0)
+    else:
+        predicted_probs = model.predict(np.asarray(inputs), verbose=0)
 
-def predict_disease(input_df: pd.DataFrame) -> Tuple[str, float, List[Tuple[str, float]]]:
-    input_array = np.array(input_df).reshape(1, -1)
-    predicted_probs = model.predict(input_array)[0]
+    top_indices, top_conf = top_k(np.asarray(predicted_probs), k)
+    top_labels = labels[top_indices]
 
-    top_3_indices = np.argsort(predicted_probs)[-3:][::-1]
-    top_3_labels = label_encoder.inverse_transform(top_3_indices)
-    top_3_conf = predicted_probs[top_3_indices]
+    results = []
+    for row_labels, row_conf in zip(top_labels.tolist(), top_conf.tolist()):
+        top = list(zip(row_labels, row_conf))
+        results.append((top[0][0], top[0][1], top))
 
-    top_prediction = top_3_labels[0]
-    confidence = float(top_3_conf[0])
-    top_3 = [(top_3_labels[i], float(top_3_conf[i])) for i in range(3)]
+    return results
 
-    return top_prediction, confidence, top_3
\ No newline at end of file
+def predict_disease(input_row) -> Tuple[str, float, List[Tuple[str, float]]]:
+    if isinstance(input_row, SparseRows):
+        return predict_batch(input_row)[0]
+    return predict_batch(np.asarray(input_row).reshape(1, -1))[0]
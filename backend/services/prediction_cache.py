@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Optional
+
+from services.model_registry import registry
+
+ARTIFACTS_DIR = "./data/Model Artifacts"
+
+CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "16"))
+CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+ARTIFACT_CHECK_SECONDS = float(os.getenv("PREDICTION_CACHE_ARTIFACT_CHECK_SECONDS", "5"))
+# Registry entries loaded from the artifacts directory (see services.prediction)
+MODEL_ARTIFACTS = ["label_encoder", "le_gender", "le_smoking", "le_alcohol", "scaler", "input_columns",
+                   "feature_encoder", "disease_labels", "disease_model"]
+
+
+def artifacts_fingerprint(directory: str = ARTIFACTS_DIR) -> str:
+    """
+    Hash of the path, size and mtime of every file under the model artifacts directory.
+    """
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _result_size(value: Any) -> int:
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_result_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of prediction results keyed on a hash of the encoded
+    feature row. Entries are bounded by count and approximate memory, and
+    the whole cache is dropped when the model artifacts on disk change; the
+    registry's model and encoder are reset at the same time, so the next
+    prediction loads the new artifacts instead of refilling the cache from
+    the old model.
+    """
+
+    def __init__(self,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024),
+                 ttl_seconds: float = CACHE_TTL_SECONDS,
+                 artifacts_dir: str = ARTIFACTS_DIR,
+                 check_interval: float = ARTIFACT_CHECK_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.artifacts_dir = artifacts_dir
+        self.check_interval = check_interval
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._fingerprint = artifacts_fingerprint(artifacts_dir)
+        self._last_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(input_row) -> str:
+        if hasattr(input_row, "key_bytes"):
+            data = input_row.key_bytes()
+        else:
+            data = np.ascontiguousarray(input_row, dtype=np.float32).reshape(-1).tobytes()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _check_artifacts(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        fingerprint = artifacts_fingerprint(self.artifacts_dir)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            for name in MODEL_ARTIFACTS:
+                try:
+                    registry.reset(name)
+                except KeyError:
+                    pass  # not registered in this process
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, input_row) -> Optional[Any]:
+        key = self.key_for(input_row)
+        with self._lock:
+            self._check_artifacts()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, input_row, value: Any):
+        key = self.key_for(input_row)
+        size = sys.getsizeof(key) + _result_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "approx_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+prediction_cache = PredictionCache()
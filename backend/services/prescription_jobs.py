@@ -0,0 +1,436 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import Prescription, PrescriptionJob, PrescriptionContent, MedicationReminder
+from services.ocr_pool import ocr_pool
+from services.upload_store import upload_store
+from utils.pdf_img_parser import extract_prescription_data
+
+logger = logging.getLogger("prescription_jobs")
+
+JOB_WORKERS = int(os.getenv("PRESCRIPTION_JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("PRESCRIPTION_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("PRESCRIPTION_JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_MAX_QUEUED = int(os.getenv("PRESCRIPTION_JOB_MAX_QUEUED", "500"))
+# Running jobs renew their lease every JOB_HEARTBEAT_SECONDS; one whose lease
+# is older than JOB_STALE_SECONDS was orphaned by a crashed worker and is
+# requeued by the sweep, which runs every JOB_HEARTBEAT_SECONDS as well
+JOB_HEARTBEAT_SECONDS = float(os.getenv("PRESCRIPTION_JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("PRESCRIPTION_JOB_STALE_SECONDS", "120"))
+
+STAGE_PROGRESS = {"queued": 0, "ocr": 20, "parsing": 60, "reminders": 90, "done": 100}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def parse_date(date_str):
+    if date_str and date_str.strip():
+        try:
+            return datetime.strptime(date_str, "%Y-%m-%d").date()
+        except Exception:
+            return None
+    return None
+
+
+def job_status(job: PrescriptionJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": STAGE_PROGRESS.get(job.stage, 0),
+        "attempts": job.attempts,
+        "error": job.error,
+        "prescription_id": job.prescription_id,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "prescription": job.prescription,
+    }
+
+
+class PrescriptionJobQueue:
+    """
+    Processes uploaded prescriptions in the background: OCR -> parse (rules,
+    or the LLM when they aren't confident) -> Prescription +
+    MedicationReminder rows. Jobs live in the
+    prescription_jobs table, so they survive restarts and need no external
+    broker; an in-process asyncio queue only wakes the `workers` worker
+    tasks, which bounds how many uploads are processed at once. Jobs are
+    claimed with a conditional UPDATE, so several app processes can share
+    the table, and hold a lease (heartbeat_at) while they run; a periodic
+    sweep requeues jobs whose lease expired because their worker died.
+    Failed jobs are retried with linear backoff up to
+    `max_attempts`; OCR output is kept on the job so retries skip it.
+    OCR text and medications are also cached per file content (see
+    services.upload_store), so re-uploads of a known file finish at once.
+    """
+
+    def __init__(self,
+                 workers: int = JOB_WORKERS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS,
+                 retry_backoff: float = JOB_RETRY_BACKOFF_SECONDS,
+                 max_queued: int = JOB_MAX_QUEUED):
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.max_queued = max_queued
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.succeeded = 0
+        self.partial = 0
+        self.failed = 0
+        self.retries = 0
+        self.requeued_stale = 0
+        self.parsed_by = {"rules": 0, "llm": 0}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and any(not t.done() for t in self._tasks):
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._sweeper()))
+        self._recover()
+
+    def _requeue_stale(self) -> list:
+        """
+        Put running jobs whose lease expired back to queued; returns their ids.
+        """
+        db = SessionLocal()
+        try:
+            stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+            lease = func.coalesce(PrescriptionJob.heartbeat_at, PrescriptionJob.started_at)
+            stale = [job_id for (job_id,) in (db.query(PrescriptionJob.id)
+                                              .filter(PrescriptionJob.status == "running", lease < stale_before)
+                                              .all())]
+            requeued = []
+            for job_id in stale:
+                # Conditional, so a job renewed in the meantime is left alone
+                if (db.query(PrescriptionJob)
+                      .filter(PrescriptionJob.id == job_id, PrescriptionJob.status == "running", lease < stale_before)
+                      .update({"status": "queued", "stage": "queued"}, synchronize_session=False)):
+                    requeued.append(job_id)
+            db.commit()
+        finally:
+            db.close()
+        self.requeued_stale += len(requeued)
+        if requeued:
+            logger.warning(f"Requeued {len(requeued)} prescription job(s) with an expired lease")
+        return requeued
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                for job_id in await asyncio.to_thread(self._requeue_stale):
+                    self._queue.put_nowait(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stale prescription job sweep failed: {e}")
+
+    def _recover(self):
+        """
+        Requeue stale running jobs and wake workers for everything queued.
+        """
+        self._requeue_stale()
+        db = SessionLocal()
+        try:
+            queued = (db.query(PrescriptionJob.id)
+                        .filter(PrescriptionJob.status == "queued")
+                        .order_by(PrescriptionJob.created_at)
+                        .all())
+        finally:
+            db.close()
+        for (job_id,) in queued:
+            self._queue.put_nowait(job_id)
+        if queued:
+            logger.info(f"Resumed {len(queued)} queued prescription job(s)")
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    # ---------- producing ----------
+    def enqueue(self, db: Session, user_id: str, content: PrescriptionContent) -> PrescriptionJob:
+        """
+        Queue a stored upload. Files whose text and medications are already
+        cached are completed right away, without touching the queue.
+        """
+        if content.ocr_text is not None and content.medications is not None:
+            return self._complete_from_cache(db, user_id, content)
+
+        self.start()
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFullError("Too many prescriptions are waiting to be processed, please retry shortly.")
+        job = PrescriptionJob(user_id=user_id, file_name=content.file_name, content_hash=content.sha256,
+                              status="queued", stage="queued", attempts=0)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def _complete_from_cache(self, db: Session, user_id: str, content: PrescriptionContent) -> PrescriptionJob:
+        result = upload_store.cached_text(content)
+        medications = upload_store.cached_medications(content)
+        now = datetime.utcnow()
+        job = PrescriptionJob(user_id=user_id, file_name=content.file_name, content_hash=content.sha256,
+                              status="succeeded", stage="done", attempts=0, result=result,
+                              started_at=now, finished_at=now)
+        db.add(job)
+        self._save_prescription(db, job, result, medications)
+        db.commit()
+        db.refresh(job)
+        self.succeeded += 1
+        return job
+
+    # ---------- consuming ----------
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Prescription job {job_id} crashed: {e}")
+
+    def _claim(self, job_id: str) -> Optional[dict]:
+        """
+        Take a queued job and load what it needs: a snapshot of the job, its
+        OCR result (kept on the job or cached for the file) and cached
+        medications. None if another worker has it or it isn't queued.
+        """
+        db = SessionLocal()
+        try:
+            claimed = (db.query(PrescriptionJob)
+                         .filter(PrescriptionJob.id == job_id, PrescriptionJob.status == "queued")
+                         .update({"status": "running", "started_at": datetime.utcnow(),
+                                  "heartbeat_at": datetime.utcnow(), "attempts": PrescriptionJob.attempts + 1},
+                                 synchronize_session=False))
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(PrescriptionJob, job_id)
+            content = db.get(PrescriptionContent, job.content_hash) if job.content_hash else None
+            result = dict(job.result or {})
+            if "text" not in result:
+                result = upload_store.cached_text(content)
+                if result is not None:
+                    job.result = result
+                    db.commit()
+            return {
+                "id": job.id,
+                "file_name": job.file_name,
+                "content_hash": content.sha256 if content is not None else None,
+                "attempts": job.attempts,
+                "result": result,
+                "medications": upload_store.cached_medications(content),
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _renew_lease(job_id: str):
+        db = SessionLocal()
+        try:
+            (db.query(PrescriptionJob)
+               .filter(PrescriptionJob.id == job_id, PrescriptionJob.status == "running")
+               .update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self._renew_lease, job_id)
+            except Exception as e:
+                logger.warning(f"Could not renew lease of prescription job {job_id}: {e}")
+
+    @staticmethod
+    def _set_stage(job_id: str, stage: str):
+        db = SessionLocal()
+        try:
+            db.get(PrescriptionJob, job_id).stage = stage
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_result(job_id: str, result: dict, content_hash: Optional[str] = None,
+                     text: Optional[str] = None, medications: Optional[list] = None):
+        """
+        Keep `result` on the job, so retries skip finished stages, and cache
+        the OCR text or medications for the file.
+        """
+        db = SessionLocal()
+        try:
+            db.get(PrescriptionJob, job_id).result = dict(result)
+            content = db.get(PrescriptionContent, content_hash) if content_hash else None
+            if content is not None and text is not None:
+                upload_store.save_text(db, content, text, result.get("ocr"))
+            if content is not None and medications is not None:
+                upload_store.save_medications(db, content, medications)
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, result: dict, medications: list, parse_error: Optional[str]):
+        db = SessionLocal()
+        try:
+            job = db.get(PrescriptionJob, job_id)
+            job.stage = "reminders"
+            db.commit()
+            self._save_prescription(db, job, result, medications)
+            job.status = "partial" if parse_error else "succeeded"
+            job.error = parse_error
+            job.stage = "done"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _requeue(job_id: str, error: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            job = db.get(PrescriptionJob, job_id)
+            job.status, job.stage = "queued", "queued"
+            if error is not None:
+                job.error = error
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process(self, job_id: str):
+        """
+        Run one job. Every database step runs in a worker thread with its
+        own session, so the event loop only waits on OCR and the parser.
+        """
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return  # already taken by another worker or no longer queued
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            result = job["result"]
+            if result is None:
+                await asyncio.to_thread(self._set_stage, job_id, "ocr")
+                ocr = await ocr_pool.extract_text(upload_store.path(job["file_name"]),
+                                                  os.path.splitext(job["file_name"])[1])
+                result = {"text": ocr.text, "ocr": ocr.timings()}
+                await asyncio.to_thread(self._save_result, job_id, result, job["content_hash"], text=ocr.text)
+
+            parse_error = None
+            medications = job["medications"]
+            if medications is None:
+                await asyncio.to_thread(self._set_stage, job_id, "parsing")
+                try:
+                    parsed = await extract_prescription_data(result["text"])
+                    medications = parsed.get("medications", [])
+                    result["parser"] = parsed["parser"]
+                    self.parsed_by[parsed["parser"]["method"]] += 1
+                    await asyncio.to_thread(self._save_result, job_id, result, job["content_hash"],
+                                            medications=medications)
+                except Exception as e:
+                    if job["attempts"] < self.max_attempts:
+                        raise
+                    # Out of retries: keep the prescription text, like the synchronous upload did
+                    medications, parse_error = [], str(e)
+
+            await asyncio.to_thread(self._finish, job_id, result, medications, parse_error)
+            if parse_error:
+                self.partial += 1
+            else:
+                self.succeeded += 1
+
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self._requeue, job_id)
+            raise
+        except Exception as e:
+            await self._fail(job_id, job["attempts"], e)
+        finally:
+            heartbeat.cancel()
+
+    def _save_prescription(self, db: Session, job: PrescriptionJob, result: dict, medications: list):
+        prescription = Prescription(
+            user_id=job.user_id,
+            file_name=job.file_name,
+            extracted_data={"text": result["text"], "ocr": result.get("ocr"), "parser": result.get("parser"),
+                            "medications": medications},
+        )
+        db.add(prescription)
+        for item in medications:
+            db.add(MedicationReminder(
+                user_id=job.user_id,
+                drug_name=item.get("drug_name"),
+                dosage=item.get("dosage"),
+                timing=item.get("timing"),
+                start_date=parse_date(item.get("start_date")),
+                end_date=parse_date(item.get("end_date")),
+            ))
+        db.flush()
+        job.prescription_id = prescription.id
+
+    @staticmethod
+    def _mark_failed(job_id: str, error: str):
+        db = SessionLocal()
+        try:
+            job = db.get(PrescriptionJob, job_id)
+            job.status, job.error = "failed", error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    async def _fail(self, job_id: str, attempts: int, error: Exception):
+        if attempts < self.max_attempts:
+            await asyncio.to_thread(self._requeue, job_id, str(error))
+            self.retries += 1
+            delay = self.retry_backoff * attempts
+            logger.warning(f"Prescription job {job_id} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+            self._loop.call_later(delay, self._queue.put_nowait, job_id)
+        else:
+            await asyncio.to_thread(self._mark_failed, job_id, str(error))
+            self.failed += 1
+            logger.warning(f"Prescription job {job_id} failed after {attempts} attempts: {error}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "succeeded": self.succeeded,
+            "partial": self.partial,
+            "failed": self.failed,
+            "retries": self.retries,
+            "requeued_stale": self.requeued_stale,
+            "parsed_by_rules": self.parsed_by["rules"],
+            "parsed_by_llm": self.parsed_by["llm"],
+        }
+
+
+prescription_jobs = PrescriptionJobQueue()
@@ -0,0 +1,183 @@
+import os
+import re
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+
+from services.model_registry import registry
+from services.drug_catalog import drug_catalog
+from services.drug_resolver import drug_resolver
+from services.bm25 import BM25Index, reciprocal_rank_fusion
+
+logger = logging.getLogger("retrieval")
+
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Exact vectors written next to the serving index by build_faiss_index.py
+FLAT_INDEX_PATH = "./faiss_store/flat.faiss"
+
+
+class GuidelineRetriever:
+    """
+    Search over the guideline FAISS store that can be scoped to one drug or
+    to the drugs of one disease. Each drug keeps only the ids of its
+    vectors (a per-drug sub-index); a scoped query reads just those vectors
+    from the memory-mapped index and scores them, so no copy of the corpus
+    is held in RAM. Unscoped or unknown scopes fall back to the global
+    FAISS search. Scoped vectors come from the exact flat index when one is
+    given, so quantized serving indexes don't degrade scoped results.
+
+    A BM25 index over the same documents catches exact drug names and
+    doses that MiniLM blurs; `hybrid_search` fuses both rankings with
+    reciprocal-rank fusion, and answers questions that name an indexed
+    drug from BM25 alone, without embedding the question.
+    """
+
+    def __init__(self, vectorstore, exact_index=None):
+        import faiss
+
+        self.vectorstore = vectorstore
+        self.index = vectorstore.index
+        self.metric_inner_product = self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+        self.source = exact_index if exact_index is not None else self.index
+        # IVF indexes need a direct map before vectors can be reconstructed by id
+        try:
+            faiss.extract_index_ivf(self.source).make_direct_map()
+        except Exception:
+            pass
+
+        ids_by_drug: Dict[str, List[int]] = {}
+        texts = [""] * (max(vectorstore.index_to_docstore_id, default=-1) + 1)
+        for faiss_id, docstore_id in vectorstore.index_to_docstore_id.items():
+            doc = vectorstore.docstore.search(docstore_id)
+            texts[faiss_id] = getattr(doc, "page_content", "") or ""
+            drug = (getattr(doc, "metadata", None) or {}).get("drug")
+            if drug:
+                ids_by_drug.setdefault(drug.strip().lower(), []).append(faiss_id)
+        self.bm25 = BM25Index(texts)
+
+        self.sub_indexes: Dict[str, np.ndarray] = {
+            drug: np.asarray(ids, dtype=np.int64) for drug, ids in ids_by_drug.items()
+        }
+
+        # Drug names as word tuples, for spotting them inside a question
+        self.drug_names = {tuple(WORD_RE.findall(drug)): drug for drug in self.sub_indexes}
+        self.max_name_words = max((len(words) for words in self.drug_names), default=0)
+
+        logger.info(f"Built drug sub-indexes for {len(self.sub_indexes)} drugs")
+
+    def _documents(self, faiss_ids) -> list:
+        docs = []
+        for faiss_id in faiss_ids:
+            docstore_id = self.vectorstore.index_to_docstore_id.get(int(faiss_id))
+            if docstore_id is not None:
+                docs.append(self.vectorstore.docstore.search(docstore_id))
+        return docs
+
+    def scope_ids(self, drug: Optional[str] = None, disease: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Drug keys to search, or None when the query should be global.
+        """
+        if drug and drug.strip().lower() in self.sub_indexes:
+            return [drug.strip().lower()]
+        if disease:
+            drugs = [d.strip().lower() for d in drug_catalog.drugs_for_disease(disease)]
+            drugs = [d for d in drugs if d in self.sub_indexes]
+            if drugs:
+                return drugs
+        return None
+
+    def match_drug(self, text: str) -> Optional[str]:
+        """
+        The longest indexed drug name that appears word-for-word in `text`,
+        else one named by a synonym (paracetamol -> acetaminophen).
+        """
+        words = WORD_RE.findall(text.lower())
+        for size in range(min(self.max_name_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                drug = self.drug_names.get(tuple(words[start:start + size]))
+                if drug:
+                    return drug
+        match = drug_resolver.find(text)
+        if match and match["canonical"].strip().lower() in self.sub_indexes:
+            return match["canonical"].strip().lower()
+        return None
+
+    def _vector_ranking(self, query_vector, k: int, scope: Optional[List[str]]) -> List[int]:
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+
+        if scope is None:
+            _, ids = self.index.search(query.reshape(1, -1), k)
+            return [int(i) for i in ids[0] if i != -1]
+
+        ids = np.concatenate([self.sub_indexes[d] for d in scope])
+        vectors = self.source.reconstruct_batch(ids)
+        if self.metric_inner_product:
+            order = np.argsort(-(vectors @ query))
+        else:
+            order = np.argsort(((vectors - query) ** 2).sum(axis=1))
+        return ids[order[:k]].tolist()
+
+    def _lexical_ranking(self, text: str, k: int, scope: Optional[List[str]]) -> List[int]:
+        candidates = None
+        if scope is not None:
+            candidates = np.concatenate([self.sub_indexes[d] for d in scope])
+        return [doc_id for doc_id, _ in self.bm25.search(text, k, candidates)]
+
+    def search(self, query_vector, k: int = 5, drug: Optional[str] = None, disease: Optional[str] = None) -> list:
+        return self._documents(self._vector_ranking(query_vector, k, self.scope_ids(drug, disease)))
+
+    def hybrid_search(self, text: str, k: int = 5, drug: Optional[str] = None, disease: Optional[str] = None,
+                      query_vector=None) -> list:
+        """
+        BM25 + vector search fused with RRF, scoped to the requested drug (or
+        disease). A drug named in the question is searched alongside that
+        scope rather than replacing it, so "can I take it with calcium?"
+        about metformin still sees metformin's documents. When a drug is
+        named and no embedding was computed yet, the BM25 ranking over the
+        scope is used as is and the embedding is skipped.
+        """
+        requested = self.scope_ids(drug, disease)
+        named = self.match_drug(text)
+        scope = requested
+        if named:
+            scope = list(dict.fromkeys((requested or []) + [named]))
+
+        if named and query_vector is None:
+            ranking = self._lexical_ranking(text, k, scope)
+            if len(ranking) < k:
+                # Fill up with the scope's remaining sections in document order
+                seen = set(ranking)
+                for d in scope:
+                    ranking += [i for i in self.sub_indexes[d].tolist() if i not in seen]
+                    if len(ranking) >= k:
+                        break
+            return self._documents(ranking[:k])
+
+        if query_vector is None:
+            query_vector = embed_query(text)
+        fused = reciprocal_rank_fusion([
+            self._vector_ranking(query_vector, RETRIEVAL_CANDIDATES, scope),
+            self._lexical_ranking(text, RETRIEVAL_CANDIDATES, scope),
+        ], k=RRF_K)
+        return self._documents(fused[:k])
+
+
+def embed_query(text: str) -> np.ndarray:
+    return np.asarray(registry.get("embedding_model").embed_query(text), dtype=np.float32)
+
+def _load_retriever() -> GuidelineRetriever:
+    exact_index = None
+    if os.path.exists(FLAT_INDEX_PATH):
+        import faiss
+        # Memory-mapped like the serving index: scoped queries only touch their drugs' pages
+        try:
+            exact_index = faiss.read_index(FLAT_INDEX_PATH, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            exact_index = faiss.read_index(FLAT_INDEX_PATH)
+    return GuidelineRetriever(registry.get("vectorstore"), exact_index)
+
+registry.register("guideline_retriever", _load_retriever)
@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Tuple, List
+
+from services.drug_catalog import GUIDELINE_FILE
+
+logger = logging.getLogger("semantic_cache")
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "./data/semantic_cache.npz")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+SEMANTIC_CACHE_SAVE_SECONDS = float(os.getenv("SEMANTIC_CACHE_SAVE_SECONDS", "60"))
+GUIDELINE_CHECK_SECONDS = 10.0
+
+GLOBAL_SCOPE = "*"
+# Bumped when stored answers must not be reused; 2: drops entries from before history-free-only caching
+CACHE_FORMAT = 2
+
+
+def normalize_question(message: str) -> str:
+    text = message.strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ?!.")
+
+
+def _guideline_fingerprint(path: str = GUIDELINE_FILE) -> str:
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return ""
+
+
+class SemanticCache:
+    """
+    Cache of chatbot answers looked up by embedding similarity. Questions
+    are embedded with the same MiniLM model as the guideline store and
+    matched only against past questions about the same drug (or the
+    global scope when no drug is given). Entries expire after a TTL, the
+    least recently used ones are evicted past `max_entries`, and the whole
+    cache is dropped when drugs-Info.json changes. The cache is persisted
+    to disk so it survives restarts.
+
+    Entries are shared by all users, so only answers generated without any
+    conversation history or summary may be stored, and only such questions
+    looked up; callers skip the cache for users with history.
+
+    Callers pass in the question embedding (computed off the event loop by
+    the embedding service). Questions are also indexed by their normalized
+    text, so exact repeats match without one; entries stored without a
+    vector (questions that skipped embedding) only match this way.
+    """
+
+    def __init__(self,
+                 path: str = SEMANTIC_CACHE_PATH,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+                 save_interval: float = SEMANTIC_CACHE_SAVE_SECONDS):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.save_interval = save_interval
+
+        self._lock = threading.RLock()
+        # entry id -> {"scope", "question", "answer", "vector", "created_at", "cost"}
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        # scope -> (entry ids, stacked vectors); rebuilt lazily after changes
+        self._scope_index = {}
+        # (scope, normalized question) -> newest entry id
+        self._exact = {}
+        self._next_id = 0
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._last_guideline_check = 0.0
+        self._fingerprint = _guideline_fingerprint()
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    # ---------- embedding ----------
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # ---------- persistence ----------
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                vectors = data["vectors"]
+        except Exception as e:
+            logger.warning(f"Could not read semantic cache at {self.path}: {e}")
+            return
+        if meta.get("format") != CACHE_FORMAT or meta.get("guideline_fingerprint") != self._fingerprint:
+            self.invalidations += 1
+            return
+        vectors = iter(vectors)
+        for entry in meta["entries"]:
+            entry["vector"] = next(vectors) if entry.pop("has_vector", True) else None
+            self._entries[self._next_id] = entry
+            self._exact[(entry["scope"], entry["question"])] = self._next_id
+            self._next_id += 1
+        logger.info(f"Loaded {len(self._entries)} semantic cache entries")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._entries.values())
+            embedded = [e["vector"] for e in entries if e["vector"] is not None]
+            vectors = np.stack(embedded) if embedded else np.zeros((0, 0), dtype=np.float32)
+            meta = {
+                "format": CACHE_FORMAT,
+                "guideline_fingerprint": self._fingerprint,
+                "entries": [dict({k: v for k, v in e.items() if k != "vector"}, has_vector=e["vector"] is not None)
+                            for e in entries],
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+        tmp_path = self.path + ".tmp.npz"
+        try:
+            np.savez(tmp_path, vectors=vectors, meta=np.array(json.dumps(meta)))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not persist semantic cache: {e}")
+
+    # ---------- maintenance ----------
+    def _check_guidelines(self):
+        now = time.monotonic()
+        if now - self._last_guideline_check < GUIDELINE_CHECK_SECONDS:
+            return
+        self._last_guideline_check = now
+        fingerprint = _guideline_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._entries.clear()
+            self._scope_index.clear()
+            self._exact.clear()
+            self._dirty = True
+            self.invalidations += 1
+
+    def _scope_vectors(self, scope: str) -> Tuple[List[int], Optional[np.ndarray]]:
+        if scope not in self._scope_index:
+            ids = [i for i, e in self._entries.items() if e["scope"] == scope and e["vector"] is not None]
+            vectors = np.stack([self._entries[i]["vector"] for i in ids]) if ids else None
+            self._scope_index[scope] = (ids, vectors)
+        return self._scope_index[scope]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._scope_index.pop(entry["scope"], None)
+        key = (entry["scope"], entry["question"])
+        if self._exact.get(key) == entry_id:
+            del self._exact[key]
+        self._dirty = True
+
+    def _hit(self, entry_id: int, start: float) -> Optional[str]:
+        entry = self._entries[entry_id]
+        if time.time() - entry["created_at"] > self.ttl:
+            self._remove(entry_id)
+            return None
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        self.saved_seconds += max(entry["cost"] - (time.perf_counter() - start), 0.0)
+        return entry["answer"]
+
+    # ---------- public API ----------
+    def lookup(self, message: str, drug: Optional[str], vector: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        Return the cached answer or None. `vector` is the embedding of
+        `normalize_question(message)`; without it only exact repeats match.
+        """
+        start = time.perf_counter()
+        question = normalize_question(message)
+        scope = (drug or GLOBAL_SCOPE).strip().lower()
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._check_guidelines()
+
+            entry_id = self._exact.get((scope, question))
+            if entry_id is not None:
+                answer = self._hit(entry_id, start)
+                if answer is not None:
+                    return answer
+            if vector is None:
+                self.misses += 1
+                return None
+
+            vector = self._unit(vector)
+            ids, vectors = self._scope_vectors(scope)
+            if vectors is not None:
+                scores = vectors @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    answer = self._hit(ids[best], start)
+                    if answer is not None:
+                        return answer
+
+            self.misses += 1
+            return None
+
+    def store(self, message: str, drug: Optional[str], answer: str, vector: Optional[np.ndarray], cost_seconds: float):
+        scope = (drug or GLOBAL_SCOPE).strip().lower()
+        question = normalize_question(message)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._entries[self._next_id] = {
+                "scope": scope,
+                "question": question,
+                "answer": answer,
+                "vector": self._unit(vector) if vector is not None else None,
+                "created_at": time.time(),
+                "cost": round(cost_seconds, 4),
+            }
+            self._exact[(scope, question)] = self._next_id
+            self._next_id += 1
+            self._scope_index.pop(scope, None)
+            self._dirty = True
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            save_due = time.monotonic() - self._last_save >= self.save_interval
+        if save_due:
+            self.save()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "latency_saved_seconds": round(self.saved_seconds, 3),
+            "avg_latency_saved_ms": round(self.saved_seconds * 1000 / self.hits, 1) if self.hits else 0.0,
+        }
+
+
+semantic_cache = SemanticCache()
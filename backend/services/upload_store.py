@@ -0,0 +1,147 @@
+import os
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.models import PrescriptionContent
+
+logger = logging.getLogger("upload_store")
+
+UPLOAD_DIR = "uploads/prescriptions"
+UPLOAD_MAX_BYTES = int(os.getenv("PRESCRIPTION_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadStore:
+    """
+    Content-addressed store for prescription uploads. Files are kept once
+    per SHA-256 of their bytes, and the OCR text and parsed medications of
+    each file are cached on its prescription_contents row, so a re-upload
+    of the same photo or PDF skips OCR and the LLM entirely. Uploads are
+    streamed to disk in chunks while being hashed, so memory use doesn't
+    grow with file size, and anything over `max_bytes` is rejected.
+    """
+
+    def __init__(self, upload_dir: str = UPLOAD_DIR, max_bytes: int = UPLOAD_MAX_BYTES):
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        self.uploads = 0
+        self.rejected_uploads = 0
+        self.duplicate_uploads = 0
+        self.bytes_deduplicated = 0
+        self.ocr_hits = 0
+        self.ocr_misses = 0
+        self.parse_hits = 0
+        self.parse_misses = 0
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.upload_dir, file_name)
+
+    async def put_upload(self, db: Session, upload, file_ext: str) -> Tuple[PrescriptionContent, bool]:
+        """
+        Spool an UploadFile to disk in chunks, hashing as it goes. Returns the
+        content row and whether the upload was a duplicate of a stored file.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        self.rejected_uploads += 1
+                        raise UploadTooLargeError(f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit.")
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self._commit_file(db, tmp_path, digest.hexdigest(), size, file_ext)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit_file(self, db: Session, tmp_path: str, sha256: str, size: int,
+                     file_ext: str) -> Tuple[PrescriptionContent, bool]:
+        file_name = f"{sha256}.{file_ext}"
+        self.uploads += 1
+
+        content = db.get(PrescriptionContent, sha256)
+        if content is not None and os.path.exists(self.path(content.file_name)):
+            content.uploads = (content.uploads or 0) + 1
+            db.commit()
+            self.duplicate_uploads += 1
+            self.bytes_deduplicated += size
+            return content, True
+
+        # Rename into place, so readers never see a partial file
+        os.replace(tmp_path, self.path(file_name))
+        if content is None:
+            content = PrescriptionContent(sha256=sha256, file_name=file_name, size_bytes=size, uploads=1)
+            db.add(content)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Same file uploaded concurrently; the other request created the row
+                db.rollback()
+                content = db.get(PrescriptionContent, sha256)
+        return content, False
+
+    # ---------- cached results ----------
+    def cached_text(self, content: Optional[PrescriptionContent]) -> Optional[dict]:
+        if content is not None and content.ocr_text is not None:
+            self.ocr_hits += 1
+            return {"text": content.ocr_text, "ocr": content.ocr}
+        self.ocr_misses += 1
+        return None
+
+    def cached_medications(self, content: Optional[PrescriptionContent]) -> Optional[list]:
+        if content is not None and content.medications is not None:
+            self.parse_hits += 1
+            return content.medications
+        self.parse_misses += 1
+        return None
+
+    @staticmethod
+    def save_text(db: Session, content: PrescriptionContent, text: str, ocr: Optional[dict]):
+        content.ocr_text = text
+        content.ocr = ocr
+        db.commit()
+
+    @staticmethod
+    def save_medications(db: Session, content: PrescriptionContent, medications: list):
+        content.medications = medications
+        content.parsed_at = datetime.utcnow()
+        db.commit()
+
+    def stats(self, db: Optional[Session] = None) -> dict:
+        stats = {
+            "uploads": self.uploads,
+            "rejected_uploads": self.rejected_uploads,
+            "max_upload_bytes": self.max_bytes,
+            "duplicate_uploads": self.duplicate_uploads,
+            "dedup_rate": round(self.duplicate_uploads / self.uploads, 4) if self.uploads else 0.0,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "ocr_cache_hits": self.ocr_hits,
+            "ocr_cache_misses": self.ocr_misses,
+            "parse_cache_hits": self.parse_hits,
+            "parse_cache_misses": self.parse_misses,
+        }
+        if db is not None:
+            stats["stored_files"] = db.query(PrescriptionContent).count()
+        return stats
+
+
+upload_store = UploadStore()
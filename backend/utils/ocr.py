@@ -1,18 +1,256 @@
-from PIL import Image
+from PIL import Image, ImageFilter, ImageOps
+import numpy as np
 import pytesseract
-import io, os
+import io, os, re, time, tempfile, subprocess
 
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+# Rasterization resolution for PDF pages (pdf2image's default)
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+# A page's embedded text is used instead of OCR when it has at least this
+# many non-space characters and scores at least this quality (0-1)
+TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "20"))
+TEXT_LAYER_MIN_QUALITY = float(os.getenv("OCR_TEXT_LAYER_MIN_QUALITY", "0.6"))
+TEXT_LAYER_TIMEOUT_SECONDS = 10
+# ...and when embedded images cover at most this share of the page; more means
+# a scanned body (e.g. below a printed letterhead) that only OCR can read
+TEXT_LAYER_MAX_IMAGE_COVERAGE = float(os.getenv("OCR_TEXT_LAYER_MAX_IMAGE_COVERAGE", "0.25"))
+TEXT_LAYER_PUNCTUATION = set(".,;:-/()%+'\"#&*@")
+
+# Preprocessing applied to photos and scanned pages before tesseract
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") == "1"
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Long side of the paper a photo is assumed to show (A5, a prescription pad)
+OCR_PAGE_INCHES = float(os.getenv("OCR_PAGE_INCHES", "8.27"))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") == "1"
+OCR_DESKEW = os.getenv("OCR_DESKEW", "1") == "1"
+OCR_DESKEW_MAX_ANGLE = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "10"))
+OCR_CROP = os.getenv("OCR_CROP", "1") == "1"
+DESKEW_SIDE = 800
+CROP_MARGIN = 0.02
+
+# ---------- preprocessing ----------
+
+def downscale(image: Image.Image, target_dpi: int = OCR_TARGET_DPI) -> Image.Image:
+    """
+    Shrink to `target_dpi` for an OCR_PAGE_INCHES page. Tesseract's time
+    grows with pixel count, and 12 MP phone photos are far past the point
+    where more pixels help recognition.
+    """
+    max_side = int(target_dpi * OCR_PAGE_INCHES)
+    if max(image.size) <= max_side:
+        return image
+    scale = max_side / max(image.size)
+    return image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    sum0 = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu0 = sum0 / w0
+        mu1 = (sum0[-1] - sum0) / w1
+        between = w0 * w1 * (mu0 - mu1) ** 2
+    return int(np.nanargmax(between))
+
+def binarize(gray: Image.Image) -> Image.Image:
+    """
+    Flatten uneven lighting by dividing out a heavily blurred background,
+    then threshold with Otsu. Text comes out black on white.
+    """
+    background = gray.filter(ImageFilter.GaussianBlur(radius=max(gray.size) / 40))
+    pixels = np.asarray(gray, dtype=np.float32)
+    flat = np.clip(pixels / np.maximum(np.asarray(background, dtype=np.float32), 1) * 255, 0, 255).astype(np.uint8)
+    return Image.fromarray(np.where(flat > otsu_threshold(flat), 255, 0).astype(np.uint8))
+
+def skew_angle(binary: Image.Image, max_angle: float = OCR_DESKEW_MAX_ANGLE) -> float:
+    """
+    Angle (degrees) that makes text lines horizontal: the rotation whose
+    row-ink profile has the sharpest steps between lines and gaps. Searched
+    on a small copy, coarse then fine.
+    """
+    ink = ImageOps.invert(binary)
+    ink.thumbnail((DESKEW_SIDE, DESKEW_SIDE))
+
+    def sharpness(angle):
+        rows = np.asarray(ink.rotate(angle, resample=Image.NEAREST, fillcolor=0), dtype=np.float64).sum(axis=1)
+        return float(np.sum(np.diff(rows) ** 2))
+
+    best = max(np.arange(-max_angle, max_angle + 0.5, 1.0), key=sharpness)
+    best = max(np.arange(best - 1.0, best + 1.01, 0.2), key=sharpness)
+    return round(float(best), 2)
+
+def text_bbox(binary: Image.Image):
+    """
+    Bounding box of the rows and columns that carry ink, with a small
+    margin; isolated specks below a density floor are ignored.
+    """
+    ink = np.asarray(binary) < 128
+    rows = np.flatnonzero(ink.sum(axis=1) >= max(2, 0.002 * ink.shape[1]))
+    cols = np.flatnonzero(ink.sum(axis=0) >= max(2, 0.002 * ink.shape[0]))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    margin = int(CROP_MARGIN * max(ink.shape))
+    return (max(0, cols[0] - margin), max(0, rows[0] - margin),
+            min(ink.shape[1], cols[-1] + margin + 1), min(ink.shape[0], rows[-1] + margin + 1))
+
+def preprocess_image(image: Image.Image, target_dpi: int = OCR_TARGET_DPI, do_binarize: bool = OCR_BINARIZE,
+                     do_deskew: bool = OCR_DESKEW, do_crop: bool = OCR_CROP) -> Image.Image:
+    """
+    Photo/scan -> tesseract-ready page: upright by EXIF, grayscale,
+    downscaled to `target_dpi`, binarized, deskewed and cropped to the text.
+    """
+    gray = downscale(ImageOps.exif_transpose(image).convert("L"), target_dpi)
+    binary = binarize(gray) if (do_binarize or do_deskew or do_crop) else None
+    if do_deskew:
+        angle = skew_angle(binary)
+        if angle:
+            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+            binary = binary.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=255)
+    page = binary if do_binarize else gray
+    if do_crop:
+        bbox = text_bbox(binary)
+        if bbox is not None:
+            page = page.crop(bbox)
+    return page
+
+def ocr_image(image: Image.Image) -> str:
+    if OCR_PREPROCESS:
+        image = preprocess_image(image)
+    return pytesseract.image_to_string(image)
 
 def extract_text_from_image(file_bytes: bytes) -> str:
     image = Image.open(io.BytesIO(file_bytes))
-    text = pytesseract.image_to_string(image)
+    text = ocr_image(image)
     return text
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    images = convert_from_bytes(file_bytes)
+def pdf_page_count(pdf_path: str) -> int:
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def render_pdf_page(pdf_path: str, page_number: int) -> Image.Image:
+    pages = convert_from_path(pdf_path, dpi=OCR_PDF_DPI, first_page=page_number, last_page=page_number)
+    return pages[0]
+
+def _poppler(tool: str, pdf_path: str, page_number: int, *args: str):
+    """
+    stdout of a poppler tool (installed alongside pdf2image) for one page, or None if it fails.
+    """
+    try:
+        result = subprocess.run(
+            [tool, *args, "-f", str(page_number), "-l", str(page_number), pdf_path, *(["-"] if tool == "pdftotext" else [])],
+            capture_output=True, timeout=TEXT_LAYER_TIMEOUT_SECONDS,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode("utf-8", errors="replace")
+
+def pdf_text_layer(pdf_path: str, page_number: int) -> str:
+    """
+    Embedded text of one PDF page via pdftotext. Returns "" when the page
+    has none or poppler fails.
+    """
+    return _poppler("pdftotext", pdf_path, page_number, "-layout", "-enc", "UTF-8") or ""
+
+def pdf_image_coverage(pdf_path: str, page_number: int):
+    """
+    Share of the page's area (0-1) drawn by embedded images, from each
+    image's pixel size and resolution (pdfimages -list) against the page
+    size (pdfinfo). None when poppler can't tell.
+    """
+    info = _poppler("pdfinfo", pdf_path, page_number)
+    images = _poppler("pdfimages", pdf_path, page_number, "-list")
+    size = re.search(r"Page\s+\d+\s+size:\s+([\d.]+) x ([\d.]+) pts", info or "")
+    if not size or images is None:
+        return None
+    page_area = float(size.group(1)) / 72 * float(size.group(2)) / 72
+    image_area = 0.0
+    for line in images.splitlines()[2:]:  # two header lines
+        cols = line.split()
+        if len(cols) < 14 or cols[2] != "image":
+            continue  # masks and stencils don't add visible area of their own
+        try:
+            width, height, x_ppi, y_ppi = int(cols[3]), int(cols[4]), float(cols[12]), float(cols[13])
+        except ValueError:
+            continue
+        if x_ppi > 0 and y_ppi > 0:
+            image_area += width / x_ppi * height / y_ppi
+    return min(1.0, image_area / page_area) if page_area else None
+
+def text_layer_quality(text: str) -> float:
+    """
+    0-1 score of how usable an extracted text layer is. Scanned pages have
+    no text at all, and PDFs with broken font encodings yield replacement
+    characters and symbol soup instead of words.
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < TEXT_LAYER_MIN_CHARS:
+        return 0.0
+    clean = sum(1 for c in chars if c.isalnum() or c in TEXT_LAYER_PUNCTUATION) / len(chars)
+    tokens = text.split()
+    wordlike = sum(1 for t in tokens if re.search(r"[A-Za-z]{2}", t)) / len(tokens)
+    # Doses and schedules ("500mg", "1-0-1") are legitimately not words
+    return round(clean * (0.5 + 0.5 * wordlike), 3)
+
+def iter_pdf_pages(pdf_path: str):
+    """
+    Yield (page number, image) one page at a time, so only a single
+    rasterized page is held in memory regardless of document length.
+    """
+    for page_number in range(1, pdf_page_count(pdf_path) + 1):
+        yield page_number, render_pdf_page(pdf_path, page_number)
+
+def extract_pdf_page(pdf_path: str, page_number: int):
+    """
+    Text of one PDF page, from its text layer when that is good enough and
+    the page isn't mostly images, by OCR otherwise. Returns (text, method,
+    text layer quality).
+    """
+    text = pdf_text_layer(pdf_path, page_number)
+    quality = text_layer_quality(text)
+    if quality >= TEXT_LAYER_MIN_QUALITY:
+        coverage = pdf_image_coverage(pdf_path, page_number)
+        if coverage is not None and coverage <= TEXT_LAYER_MAX_IMAGE_COVERAGE:
+            return text, "text_layer", quality
+    page_img = render_pdf_page(pdf_path, page_number)
+    text = ocr_image(page_img)
+    page_img.close()
+    return text, "ocr", quality
+
+def extract_text_from_pdf_path(pdf_path: str) -> str:
     all_text = []
-    for page_img in images:
-        text = pytesseract.image_to_string(page_img)
+    for page_number in range(1, pdf_page_count(pdf_path) + 1):
+        text, _, _ = extract_pdf_page(pdf_path, page_number)
         all_text.append(text)
     return "\n\n".join(all_text)
+
+def extract_text_from_pdf(file_bytes: bytes) -> str:
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_bytes)
+        return extract_text_from_pdf_path(pdf_path)
+    finally:
+        os.remove(pdf_path)
+
+# ---------- OCR pool tasks ----------
+# Module-level so they can be pickled into services.ocr_pool worker processes.
+# They take file paths, so uploads are never copied into the worker's memory
+# whole. Each returns (text, milliseconds spent, method, text layer quality).
+
+def ocr_image_task(image_path: str):
+    start = time.perf_counter()
+    with Image.open(image_path) as image:
+        text = ocr_image(image)
+    return text, (time.perf_counter() - start) * 1000, "ocr", None
+
+def pdf_page_count_task(pdf_path: str) -> int:
+    return pdf_page_count(pdf_path)
+
+def pdf_page_task(pdf_path: str, page_number: int):
+    start = time.perf_counter()
+    text, method, quality = extract_pdf_page(pdf_path, page_number)
+    return text, (time.perf_counter() - start) * 1000, method, quality
@@ -1,27 +1,30 @@
 # utils/pdf_parser.py
 
-from utils.ocr import extract_text_from_image, extract_text_from_pdf
-import os, httpx, json, re
+from services.llm_gateway import llm_gateway
+from services.drug_resolver import drug_resolver
+from utils.prescription_rules import parse_prescription, display_name
+import os, json, re
 from dotenv import load_dotenv
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama3-70b-8192"
+# Rule-based parses scoring at least this skip the LLM
+RULES_MIN_CONFIDENCE = float(os.getenv("PRESCRIPTION_RULES_MIN_CONFIDENCE", "0.8"))
 
-async def extract_prescription_data(filepath: str) -> dict:
-    # Step 1: Load file
-    with open(filepath, "rb") as f:
-        file_bytes = f.read()
+async def extract_prescription_data(raw_text: str) -> dict:
+    # OCR has already been done once by the caller (services.ocr_pool)
 
-    # Step 2: Run OCR
-    ext = os.path.splitext(filepath)[1].lower()
-    if ext == ".pdf":
-        raw_text = extract_text_from_pdf(file_bytes)
-    else:
-        raw_text = extract_text_from_image(file_bytes)
+    # Typed prescriptions in the usual "Tab X 500mg 1-0-1 x 5 days" form don't need the LLM
+    medications, confidence = parse_prescription(raw_text)
+    if confidence >= RULES_MIN_CONFIDENCE:
+        return {
+            "raw_text": raw_text,
+            "medications": medications,
+            "parser": {"method": "rules", "confidence": confidence},
+        }
 
-    # Step 3: Ask Groq to extract structured data
+    # Ask Groq to extract structured data
     prompt = f"""You're a medical assistant. Extract structured prescription info from this text in such 
     a way that you even can rectify the typos, also remember that for dosage if the medicine is in
     tablets or pills etc then rather than just "1" just add "1 tab" as the dosage or if its present 
@@ -44,24 +47,10 @@ async def extract_prescription_data(filepath: str) -> dict:
             ]
             """
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful medical assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
-        if response.status_code != 200:
-            raise Exception("Groq API failed: " + response.text)
-        content = response.json()["choices"][0]["message"]["content"]
+    content = await llm_gateway.chat([
+        {"role": "system", "content": "You are a helpful medical assistant."},
+        {"role": "user", "content": prompt}
+    ], model=GROQ_MODEL)
 
     try:
         # Log raw content for debugging
@@ -79,6 +68,18 @@ async def extract_prescription_data(filepath: str) -> dict:
 
         medications = json.loads(json_str)
 
+        # Normalize exact and synonym matches to the catalog's spelling; close
+        # misses are only offered as candidates, the extracted name is kept
+        for item in medications:
+            name = item.get("drug_name") or ""
+            match = drug_resolver.exact(name)
+            if match:
+                item["drug_name"] = display_name(match["name"])
+            elif name.strip():
+                candidates = drug_resolver.resolve(name, limit=3)
+                if candidates:
+                    item["candidates"] = [display_name(m["name"]) for m in candidates]
+
         # Extract general additional advice from the content outside the JSON array
         # additional_advice_match = re.search(r'additional_advice"\s*:\s*"([^"]*)"', content, re.DOTALL)
         # additional_advice = ""
@@ -88,7 +89,8 @@ async def extract_prescription_data(filepath: str) -> dict:
         #     additional_advice = re.sub(r'[\x00-\x1F\x7F]', '', raw_advice).strip()
         return {
             "raw_text": raw_text,
-            "medications": medications
+            "medications": medications,
+            "parser": {"method": "llm", "rules_confidence": confidence},
             # "general_advice": additional_advice
         }
 
@@ -0,0 +1,207 @@
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from services.drug_resolver import drug_resolver
+
+MAX_NAME_WORDS = 4
+
+FORMS = {
+    "tab": "tab", "tabs": "tab", "tablet": "tab", "tablets": "tab",
+    "cap": "cap", "caps": "cap", "capsule": "cap", "capsules": "cap",
+    "syp": "ml", "syrup": "ml", "susp": "ml", "suspension": "ml",
+    "inj": "inj", "injection": "inj",
+    "drop": "drop", "drops": "drop",
+    "oint": "application", "ointment": "application", "cream": "application", "gel": "application",
+    "lotion": "application", "inhaler": "puff", "sachet": "sachet",
+}
+MORNING, NOON, EVENING, NIGHT = "08:00", "14:00", "20:00", "21:00"
+SLOT_TIMES = {3: [MORNING, NOON, EVENING], 4: ["08:00", "12:00", "16:00", "20:00"]}
+FREQUENCIES = [
+    (r"\b(?:od|qd|once\s+(?:a\s+)?daily|once\s+a\s+day)\b", [MORNING]),
+    (r"\b(?:bd|bid|twice\s+(?:a\s+)?daily|twice\s+a\s+day)\b", [MORNING, EVENING]),
+    (r"\b(?:tds|tid|thrice\s+daily|three\s+times\s+a\s+day)\b", [MORNING, NOON, EVENING]),
+    (r"\b(?:qid|qds|four\s+times\s+a\s+day)\b", SLOT_TIMES[4]),
+    (r"\b(?:hs|at\s+bedtime|at\s+night)\b", [NIGHT]),
+]
+AS_NEEDED = r"\b(?:sos|prn|as\s+needed|when\s+required)\b"
+ADVICE = r"\b(?:after\s+(?:food|meals?)|before\s+(?:food|meals?)|empty\s+stomach|with\s+(?:food|meals?|milk|water)|at\s+bedtime)\b"
+
+LINE_PREFIX = re.compile(r"^\s*(?:\d{1,2}\s*[.)]\s*)?(?:(?P<form>[a-z]+)\.?\s+)?(?P<rest>.+)$", re.I)
+STRENGTH = re.compile(r"\b(\d+(?:\.\d+)?)\s*(mg|mcg|g|ml|iu|units?|%)(?![a-z])", re.I)
+SCHEDULE = re.compile(r"(?<![\d/])([0-2])\s*-\s*([0-2])\s*-\s*([0-2])(?:\s*-\s*([0-2]))?(?![\d/])")
+DURATION = re.compile(r"(?:\bx\s*|\bfor\s+)?\b(\d{1,3})\s*(days?|d|weeks?|wks?|w|months?)\b", re.I)
+DURATION_DAYS = {"d": 1, "day": 1, "days": 1, "w": 7, "wk": 7, "wks": 7, "week": 7, "weeks": 7, "month": 30, "months": 30}
+DATE = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})\b")
+# Only a date right after a prescription-date label is trusted; a birth
+# date ("DOB", "Date of Birth", "Birth Date") must never start a course
+DATE_LABEL = re.compile(r"\b(?:date|dt|dated)\b(?!\W*of\W*birth)\W*(\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})", re.I)
+BIRTH_PREFIX = re.compile(r"\b(?:birth|dob|d\.o\.b)\W*$", re.I)
+# A labelled date further than this from today is an OCR misread or not the prescription date
+DATE_MAX_PAST_DAYS = 60
+DATE_MAX_FUTURE_DAYS = 7
+# Without a trusted date no reminder can be scheduled, so the LLM gets a look
+UNDATED_CONFIDENCE_FACTOR = 0.7
+NAME_WORD = re.compile(r"^[a-z][a-z\-]*$", re.I)
+NAME_STOPWORDS = {"x", "for", "after", "before", "with", "at", "empty", "once", "twice", "thrice", "daily",
+                  "od", "qd", "bd", "bid", "tds", "tid", "qid", "qds", "hs", "sos", "prn"}
+
+# Per-medication confidence weights; a line without timing can't reach the default threshold.
+# Only exact or synonym drug names earn NAME_WEIGHT.
+NAME_WEIGHT, DOSAGE_WEIGHT, TIMING_WEIGHT, DURATION_WEIGHT = 0.4, 0.2, 0.3, 0.1
+
+
+def display_name(name: str) -> str:
+    return name[:1].upper() + name[1:]
+
+
+def prescription_date(text: str, today: Optional[date] = None) -> Optional[date]:
+    """
+    The labelled prescription date ("Date: 12-03-2025"), or None if there is
+    none that is plausible: birth dates are skipped and dates far from
+    `today` rejected. Unlabelled dates are never used.
+    """
+    today = today or date.today()
+    for line in text.splitlines():
+        for label in DATE_LABEL.finditer(line):
+            if BIRTH_PREFIX.search(line[:label.start()]):
+                continue
+            day, month, year = (int(part) for part in DATE.search(label.group(1)).groups())
+            if year < 100:
+                year += 2000
+            try:
+                found = date(year, month, day)  # Indian prescriptions write dd-mm-yyyy
+            except ValueError:
+                continue
+            if -DATE_MAX_FUTURE_DAYS <= (today - found).days <= DATE_MAX_PAST_DAYS:
+                return found
+    return None
+
+
+def parse_timing(line: str) -> Optional[str]:
+    schedule = SCHEDULE.search(line)
+    if schedule:
+        slots = [slot for slot in schedule.groups() if slot is not None]
+        times = [time for slot, time in zip(slots, SLOT_TIMES[len(slots)]) if slot != "0"]
+        return ", ".join(times) if times else None
+    lowered = line.lower()
+    for pattern, times in FREQUENCIES:
+        if re.search(pattern, lowered):
+            return ", ".join(times)
+    if re.search(AS_NEEDED, lowered):
+        return "as needed"
+    return None
+
+
+def parse_duration_days(line: str) -> Optional[int]:
+    for match in DURATION.finditer(line):
+        unit = match.group(2).lower()
+        if unit in DURATION_DAYS:
+            return int(match.group(1)) * DURATION_DAYS[unit]
+    return None
+
+
+def resolve_drug(rest: str) -> Optional[Tuple[str, dict]]:
+    """
+    (written name, resolver match) for the longest run of leading words
+    (up to MAX_NAME_WORDS) that names a drug, exactly or else within the
+    resolver's typo budget.
+    """
+    words = []
+    for word in rest.split():
+        word = word.strip(",;:")
+        if not NAME_WORD.match(word) or word.lower() in NAME_STOPWORDS:
+            break
+        words.append(word)
+        if len(words) == MAX_NAME_WORDS:
+            break
+    phrases = [" ".join(words[:n]) for n in range(len(words), 0, -1)]
+    for phrase in phrases:
+        match = drug_resolver.exact(phrase)
+        if match:
+            return phrase, match
+    for phrase in phrases:
+        match = drug_resolver.best(phrase)
+        if match:
+            return phrase, match
+    return None
+
+
+def parse_line(line: str, start: Optional[date]) -> Optional[Tuple[dict, float]]:
+    """
+    (medication, confidence) for a line that looks like a drug entry and
+    names a known drug; ({}, 0.0) if it looks like one but can't be read;
+    None for any other line.
+    """
+    prefix = LINE_PREFIX.match(line)
+    if not prefix:
+        return None
+    form = (prefix.group("form") or "").lower()
+    rest = prefix.group("rest") if form in FORMS else (prefix.group("form") or "") + " " + prefix.group("rest")
+    strength = STRENGTH.search(line)
+    timing = parse_timing(line)
+    if form not in FORMS and not strength and not timing:
+        return None
+
+    drug = resolve_drug(rest.strip())
+    if drug is None:
+        return {}, 0.0
+    written, match = drug
+
+    if strength:
+        dosage = f"{strength.group(1)}{strength.group(2).lower()}"
+    elif form in FORMS:
+        dosage = f"1 {FORMS[form]}"
+    else:
+        dosage = None
+    days = parse_duration_days(line)
+    advice = ", ".join(dict.fromkeys(m.group(0).lower() for m in re.finditer(ADVICE, line, re.I)))
+
+    medication = {
+        "drug_name": display_name(match["name"] if match["distance"] == 0 else written),
+        "dosage": dosage or "",
+        "timing": timing or "",
+        "start_date": start.isoformat() if start else "",
+        "end_date": (start + timedelta(days=days - 1)).isoformat() if start and days else "",
+        "advice": advice,
+    }
+    if match["distance"] > 0:
+        # A near miss may be a different real drug (Ornidazole vs Tinidazole):
+        # keep the written name and leave the document to the LLM
+        medication["candidates"] = [display_name(match["name"])]
+        return medication, 0.0
+    confidence = (NAME_WEIGHT
+                  + (DOSAGE_WEIGHT if dosage else 0.0)
+                  + (TIMING_WEIGHT if timing else 0.0)
+                  + (DURATION_WEIGHT if days else 0.0))
+    return medication, confidence
+
+
+def parse_prescription(raw_text: str, today: Optional[date] = None) -> Tuple[List[dict], float]:
+    """
+    Deterministic parse of typed prescriptions ("Tab Paracetamol 500mg 1-0-1
+    x 5 days"). Returns the medications in the same shape the LLM parser
+    produces and a 0-1 confidence: the weakest medication's score, scaled
+    down by the share of drug-like lines that couldn't be read. Lines whose
+    drug only matches the catalog with a typo score 0, and prescriptions
+    without a trusted date are scaled by UNDATED_CONFIDENCE_FACTOR.
+    """
+    start = prescription_date(raw_text, today)
+    medications, scores, unreadable = [], [], 0
+    for line in raw_text.splitlines():
+        parsed = parse_line(line, start)
+        if parsed is None:
+            continue
+        medication, confidence = parsed
+        if not medication:
+            unreadable += 1
+            continue
+        medications.append(medication)
+        scores.append(confidence)
+
+    if not medications:
+        return [], 0.0
+    confidence = min(scores) * len(medications) / (len(medications) + unreadable)
+    if start is None:
+        confidence *= UNDATED_CONFIDENCE_FACTOR
+    return medications, round(confidence, 3)